@@ -1,8 +1,13 @@
-import uuid
+import base64, json, uuid
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import case, cast, delete, exists, func, literal, literal_column, tuple_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from . import models, schemas
+from sqlalchemy.orm import load_only, noload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from . import events, models, schemas
 from sqlalchemy.exc import IntegrityError
 from fastapi import Response
 
@@ -10,67 +15,387 @@ from fastapi import Response
 async def create_dream(db: AsyncSession, dream_in: schemas.DreamCreate) -> models.Dream:
     # Generate UUID if not provided
     dream_id = dream_in.id or uuid.uuid4()
-    
-    # if the row is already there, return it and bail
-    stmt = (
-        select(models.Dream)
-        .where(models.Dream.id == dream_id)
-        .options(selectinload(models.Dream.segments))
-    )
-    if (existing := (await db.execute(stmt)).scalars().first()):
-        return existing                         # idempotent path
 
-    # otherwise create as you did before
-    dream = models.Dream(id=dream_id, title=dream_in.title)
-    db.add(dream)
-    try:
-        await db.commit()                       # succeeds first time
-    except IntegrityError:
-        await db.rollback()                     # someone beat us—treat as success
-    
-    # Always reload with relationships to ensure proper serialization
+    # one round trip: insert unless the row is already there
     stmt = (
-        select(models.Dream)
-        .where(models.Dream.id == dream_id)
-        .options(selectinload(models.Dream.segments))
+        insert(models.Dream)
+        .values(id=dream_id, title=dream_in.title)
+        .on_conflict_do_nothing(index_elements=[models.Dream.id])
+        .returning(models.Dream)
     )
-    result = await db.execute(stmt)
-    dream = result.scalars().first()
-    
-    if not dream:
-        raise ValueError(f"Dream with id {dream_id} not found after creation")
-    
+    dream = (await db.execute(stmt)).scalars().first()
+    await db.commit()
+
+    if dream is None:                           # replay – return the stored row as-is
+        return await get_dream(db, str(dream_id))
+
+    set_committed_value(dream, "segments", [])  # brand new, so no segments to load
     return dream
 
-async def get_dream(db: AsyncSession, dream_id: str) -> models.Dream | None:
-    # Use selectinload to explicitly load the segments relationship
+# Columns a client may pick with GET /dreams/{id}?fields=
+DREAM_FIELDS = (
+    "title", "created", "transcript", "transcript_version", "state", "video_s3_key", "video_metadata",
+    "version", "updated_at", "segment_count", "total_duration", "last_segment_at",
+)
+
+def dream_loader(fields: tuple[str, ...] | None = None, segments: bool = True) -> list:
+    """Loader options fetching only ``fields`` (all columns when None; the key
+    and version always come along, and transcript_version with the transcript)
+    and the segments only if asked."""
+    options = [selectinload(models.Dream.segments) if segments else noload(models.Dream.segments)]
+    if fields is not None:
+        columns = [getattr(models.Dream, f) for f in fields] + [models.Dream.version]
+        if "transcript" in fields:
+            columns.append(models.Dream.transcript_version)     # see fill_stale_transcript
+        options.append(load_only(*columns))
+    return options
+
+# What each caller actually reads; unloaded columns must not be touched
+DREAM_VIEWS = {
+    "full":       dream_loader(),
+    "transcript": dream_loader(("transcript",), segments=False),
+    "video":      dream_loader(("video_s3_key", "video_metadata"), segments=False),
+    "state":      dream_loader(("state", "video_s3_key"), segments=False),
+    "finish":     dream_loader(("state", "transcript", "transcript_version", "segment_count"), segments=False),
+    "segments":   dream_loader(("state",)),
+}
+
+async def get_dream(db: AsyncSession, dream_id: str, view: str | list = "full") -> models.Dream | None:
+    """Load a dream with the loader options of a named ``view`` (or an explicit
+    option list from ``dream_loader``)."""
+    options = DREAM_VIEWS[view] if isinstance(view, str) else view
     result = await db.execute(
         select(models.Dream)
         .where(models.Dream.id == uuid.UUID(dream_id))
-        .options(selectinload(models.Dream.segments))
+        .options(*options)
+        .execution_options(populate_existing=True)   # pick up Core UPDATEs made in this session
     )
     return result.scalars().first()
 
-async def list_dreams(db: AsyncSession) -> list[models.Dream]:
-    result = await db.execute(select(models.Dream).options(selectinload(models.Dream.segments)))
-    return result.scalars().all()
+async def get_dream_version(db: AsyncSession, dream_id: str) -> int | None:
+    """Just the version, by primary key – enough to answer If-None-Match."""
+    result = await db.execute(select(models.Dream.version).where(models.Dream.id == uuid.UUID(dream_id)))
+    return result.scalar()
+
+def bump_version(dream_id: str | uuid.UUID):
+    """UPDATE marking the dream as changed; run it in the same transaction as the write."""
+    return (
+        update(models.Dream)
+        .where(models.Dream.id == uuid.UUID(str(dream_id)))
+        .values(version=models.Dream.version + 1, updated_at=datetime.utcnow())
+    )
+
+async def lock_dream(db: AsyncSession, dream_id: str):
+    """SELECT ... FOR UPDATE on the dream row. Taken before statements that
+    derive dream columns from its segments, so concurrent writers queue up and
+    each one's snapshot includes the previous one's segment change."""
+    await db.execute(select(models.Dream.id).where(models.Dream.id == uuid.UUID(str(dream_id))).with_for_update())
+
+def ordered_transcript(dream_id):
+    """Scalar subquery joining the dream's segment transcripts in segment order.
+
+    ``dream_id`` is an id, or ``models.Dream.id`` to correlate with a query
+    over dreams.
+    """
+    seg = models.AudioSegment
+    if isinstance(dream_id, (str, uuid.UUID)):
+        dream_id = uuid.UUID(str(dream_id))
+    text_ = func.btrim(seg.transcript)
+    return (
+        select(func.string_agg(text_, aggregate_order_by(literal_column("' '"), seg.order, seg.id)))
+        .where(seg.dream_id == dream_id, text_ != "")
+        .scalar_subquery()
+    )
+
+def current_transcript():
+    """Dream.transcript, or the segments' text joined afresh where it's stale.
+    A plain read, so it's fine on the replica."""
+    return case(
+        (models.Dream.transcript_version.is_(None), ordered_transcript(models.Dream.id)),
+        else_=models.Dream.transcript,
+    )
+
+async def fill_stale_transcript(db: AsyncSession, dream: models.Dream):
+    """Give a loaded dream whose stored transcript is stale the current one,
+    without writing it back (see refresh_transcript for that)."""
+    if dream.transcript_version is None:
+        transcript = (await db.execute(select(ordered_transcript(dream.id)))).scalar()
+        set_committed_value(dream, "transcript", transcript)
+
+async def store_segment_transcript(db: AsyncSession, dream_id: str, segment_id: str, transcript: str) -> bool:
+    """Save a segment's transcript and mark the dream transcript stale in one
+    statement. False if the segment is gone. The caller commits.
+
+    Rejoining every segment here would make a dream's transcription quadratic
+    in its segment count; the dream transcript is joined once, when it's read
+    or the dream is finished.
+    """
+    stored = (
+        update(models.AudioSegment)
+        .where(models.AudioSegment.id == uuid.UUID(segment_id))
+        .values(transcript=transcript, transcription_status=models.TranscriptionStatus.completed)
+        .returning(models.AudioSegment.id)
+        .cte("stored")
+    )
+    staled = (
+        bump_version(dream_id)
+        .where(exists(select(stored.c.id)))
+        .values(transcript_version=None)
+        .cte("staled")
+    )
+    return (await db.execute(select(stored.c.id).add_cte(staled))).first() is not None
+
+async def refresh_transcript(db: AsyncSession, dream_id: str) -> str | None:
+    """Store the segment-ordered transcript of a dream whose transcript is
+    stale and return it; returns None (and changes nothing) for dreams that
+    are already current."""
+    await lock_dream(db, dream_id)
+    result = await db.execute(
+        bump_version(dream_id)
+        .where(models.Dream.transcript_version.is_(None))
+        .values(transcript=ordered_transcript(dream_id), transcript_version=models.Dream.version + 1)
+        .returning(models.Dream.transcript)
+    )
+    row = result.first()
+    await db.commit()
+    return row.transcript if row else None
+
+# Columns every list item carries; heavier ones are opt-in via ``include``.
+SUMMARY_COLUMNS = (
+    "id", "created", "title", "state", "video_s3_key", "version", "updated_at",
+    "segment_count", "total_duration", "last_segment_at",
+)
+LIST_INCLUDES = {"segments", "transcript", "video_metadata"}
+
+def encode_cursor(created: datetime, dream_id: uuid.UUID) -> str:
+    raw = json.dumps([created.isoformat(), str(dream_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created, dream_id = json.loads(raw)
+        return datetime.fromisoformat(created), uuid.UUID(dream_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def list_dreams(
+    db: AsyncSession,
+    limit: int,
+    cursor: str | None = None,
+    include: set[str] = frozenset(),
+) -> tuple[list[dict], str | None]:
+    """One page of dreams, newest first, keyset-paginated on (created, id).
+
+    Returns plain dicts holding only the summary columns plus whatever was
+    asked for in ``include``, and the cursor for the next page (None on the
+    last page).
+    """
+    columns = [getattr(models.Dream, c) for c in SUMMARY_COLUMNS]
+    if "transcript" in include:
+        columns.append(current_transcript().label("transcript"))
+    if "video_metadata" in include:
+        columns.append(models.Dream.video_metadata)
+    stmt = (
+        select(*columns)
+        .order_by(models.Dream.created.desc(), models.Dream.id.desc())
+        .limit(limit + 1)                       # one extra row tells us if there is a next page
+    )
+    if cursor:
+        stmt = stmt.where(tuple_(models.Dream.created, models.Dream.id) < tuple_(*decode_cursor(cursor)))
+
+    rows = (await db.execute(stmt)).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1]["created"], items[-1]["id"]) if len(rows) > limit else None
+
+    if "segments" in include and items:
+        by_dream = defaultdict(list)
+        result = await db.execute(
+            select(models.AudioSegment)
+            .where(models.AudioSegment.dream_id.in_([item["id"] for item in items]))
+            .order_by(models.AudioSegment.dream_id, models.AudioSegment.order)
+        )
+        for seg in result.scalars():
+            by_dream[seg.dream_id].append(seg)
+        for item in items:
+            item["segments"] = by_dream[item["id"]]
+
+    return items, next_cursor
+
+EXPORT_BATCH = 500
+SEGMENT_EXPORT_COLUMNS = ("id", "filename", "duration", "order", "s3_key", "transcript", "transcription_status")
+
+async def export_dreams(
+    db: AsyncSession,
+    fields: tuple[str, ...] = DREAM_FIELDS,
+    since: datetime | None = None,
+    segments: bool = False,
+):
+    """Yield every dream changed at or after ``since`` (all when None), as
+    lists of plain dicts, EXPORT_BATCH rows at a time in updated_at order.
+
+    Rows come off a server-side cursor, so memory stays flat however big the
+    table is. With ``segments`` each batch costs one more query for its
+    dreams' segments.
+    """
+    dream = models.Dream
+    stmt = (
+        select(dream.id, *(
+            current_transcript().label(f) if f == "transcript" else getattr(dream, f)
+            for f in fields if f != "id"
+        ))
+        .order_by(dream.updated_at, dream.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    if since is not None:
+        stmt = stmt.where(dream.updated_at >= since)
+
+    result = await db.stream(stmt)
+    async for batch in result.mappings().partitions():
+        items = [dict(row) for row in batch]
+        if segments:
+            by_dream = defaultdict(list)
+            seg = models.AudioSegment
+            rows = await db.execute(
+                select(seg.dream_id, *(getattr(seg, c) for c in SEGMENT_EXPORT_COLUMNS))
+                .where(seg.dream_id.in_([item["id"] for item in items]))
+                .order_by(seg.dream_id, seg.order)
+            )
+            for row in rows.mappings():
+                by_dream[row["dream_id"]].append({c: row[c] for c in SEGMENT_EXPORT_COLUMNS})
+            for item in items:
+                item["segments"] = by_dream[item["id"]]
+        yield items
+
+SEARCH_SNIPPET_OPTIONS = "MaxFragments=2, MinWords=5, MaxWords=18, FragmentDelimiter=\" … \""
+
+def encode_search_cursor(score: float, dream_id: uuid.UUID) -> str:
+    raw = json.dumps([score, str(dream_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, dream_id = json.loads(raw)
+        return float(score), uuid.UUID(dream_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def search_dreams(
+    db: AsyncSession,
+    q: str,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """Dreams matching ``q``, best first, keyset-paginated on (score, id).
+
+    Matches full-text on title and transcript (web search syntax: quoted
+    phrases, OR, -word) through the search_vector GIN index, plus fuzzy title
+    matches through pg_trgm for typos. The score is the better of the two,
+    both scaled to 0..1. Each item is a summary plus ``score`` and a
+    highlighted ``snippet`` of the transcript.
+    """
+    dream = models.Dream
+    query = func.websearch_to_tsquery(models.SEARCH_CONFIG, q)
+    score = func.greatest(
+        func.ts_rank_cd(dream.search_vector, query, 32),     # 32: rank / (rank + 1)
+        func.similarity(dream.title, q),
+    )
+    stmt = (
+        select(*(getattr(dream, c) for c in SUMMARY_COLUMNS), dream.transcript, score.label("score"))
+        .where(dream.search_vector.op("@@")(query) | dream.title.op("%")(q))
+        .order_by(score.desc(), dream.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(tuple_(score, dream.id) < tuple_(*decode_search_cursor(cursor)))
+    page = stmt.subquery()
+
+    # ts_headline is expensive, so it only runs on the rows of this page
+    result = await db.execute(
+        select(
+            *(page.c[c] for c in SUMMARY_COLUMNS),
+            page.c.score,
+            func.ts_headline(
+                models.SEARCH_CONFIG, func.coalesce(page.c.transcript, page.c.title), query, SEARCH_SNIPPET_OPTIONS
+            ).label("snippet"),
+        )
+        .order_by(page.c.score.desc(), page.c.id.desc())
+    )
+    rows = result.mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_search_cursor(items[-1]["score"], items[-1]["id"]) if len(rows) > limit else None
+    return items, next_cursor
 
 async def update_title(db: AsyncSession, dream_id: str, title: str):
-    dream = await get_dream(db, dream_id)
-    if dream:
-        dream.title = title
-        await db.commit()
-        return dream
-    return None
+    # the updated row comes straight back from RETURNING; only segments need a query
+    stmt = (
+        bump_version(dream_id)
+        .values(title=title)
+        .returning(models.Dream)
+        .options(selectinload(models.Dream.segments))
+        .execution_options(populate_existing=True)
+    )
+    dream = (await db.execute(stmt)).scalars().first()
+    if dream is None:
+        return None
+    await db.commit()
+    return dream
+
+async def get_dream_state(db: AsyncSession, dream_id: str) -> models.DreamState | None:
+    result = await db.execute(select(models.Dream.state).where(models.Dream.id == uuid.UUID(dream_id)))
+    return result.scalar()
+
+async def transition_state(
+    db: AsyncSession,
+    dream_id: str,
+    expected: models.DreamState,
+    target: models.DreamState,
+    commit: bool = True,
+    **values,
+) -> bool:
+    """Compare-and-set the dream's state in one statement.
+
+    Runs ``UPDATE dreams ... WHERE id = :id AND state = :expected RETURNING``
+    with the ``dream_state_history`` row inserted from its RETURNING in the
+    same statement; extra column ``values`` ride along in the UPDATE. Returns
+    False, rolling back the caller's pending work, when the dream is gone or
+    another writer moved it first. Publishes STATE_CHANGED and commits, unless
+    ``commit=False`` leaves the transaction open for the caller's own writes.
+    """
+    if not expected.can_transition_to(target):
+        raise ValueError(f"Illegal dream state transition {expected.value} -> {target.value}")
 
-async def set_state(db: AsyncSession, dream_id: str, state: models.DreamState):
-    dream = await get_dream(db, dream_id)
-    if dream:
-        dream.state = state
+    moved = (
+        bump_version(dream_id)
+        .where(models.Dream.state == expected)
+        .values(state=target, **values)
+        .returning(models.Dream.id)
+    )
+    if expected != target:
+        moved = moved.cte("moved")
+        state_type = models.Dream.state.type
+        moved = (
+            insert(models.DreamStateHistory)
+            .from_select(
+                ["dream_id", "from_state", "to_state", "changed_at"],
+                select(
+                    moved.c.id,
+                    cast(literal(expected.value), state_type),
+                    cast(literal(target.value), state_type),
+                    literal(datetime.utcnow()),
+                ),
+            )
+            .returning(models.DreamStateHistory.dream_id)
+        )
+    if (await db.execute(moved)).first() is None:
+        await db.rollback()
+        return False
+    if expected != target:
+        await events.publish(db, dream_id, events.STATE_CHANGED, {"state": target.value})
+    if commit:
         await db.commit()
-        # Refresh to get updated state with relationships
-        return await get_dream(db, dream_id)
-    return None
+    return True
 
 # AudioSegment ---------------------------------------------------------
 
@@ -79,38 +404,114 @@ async def get_segment(db: AsyncSession, dream_id: str, segment_id: str):
     result = await db.execute(stmt)
     return result.scalars().first()
 
+async def list_segments(db: AsyncSession, dream_id: str) -> list[models.AudioSegment] | None:
+    """Segments of a dream in order, or None if the dream doesn't exist."""
+    dream_uuid = uuid.UUID(dream_id)
+    result = await db.execute(
+        select(models.AudioSegment)
+        .where(models.AudioSegment.dream_id == dream_uuid)
+        .order_by(models.AudioSegment.order)
+    )
+    segments = result.scalars().all()
+    if not segments and (await db.execute(select(models.Dream.id).where(models.Dream.id == dream_uuid))).first() is None:
+        return None
+    return segments
+
 async def remove_segment(db: AsyncSession, dream_id: str, segment_id: str):
-    stmt = select(models.AudioSegment).where(models.AudioSegment.id == uuid.UUID(segment_id), models.AudioSegment.dream_id == uuid.UUID(dream_id))
-    result = await db.execute(stmt)
-    seg = result.scalars().first()
-    if seg:
-        await db.delete(seg)
-        await db.commit()
+    # DELETE ... RETURNING with the dream's counters and version adjusted and
+    # its transcript marked stale in the same statement
+    await lock_dream(db, dream_id)
+    deleted = (
+        delete(models.AudioSegment)
+        .where(models.AudioSegment.id == uuid.UUID(segment_id), models.AudioSegment.dream_id == uuid.UUID(dream_id))
+        .returning(*models.AudioSegment.__table__.c)
+        .cte("deleted")
+    )
+    touched = (
+        bump_version(dream_id)
+        .where(exists(select(deleted.c.id)))
+        .values(
+            segment_count=models.Dream.segment_count - select(func.count()).select_from(deleted).scalar_subquery(),
+            total_duration=models.Dream.total_duration - select(func.coalesce(func.sum(deleted.c.duration), 0.0)).scalar_subquery(),
+            transcript_version=None,
+        )
+        .cte("touched")
+    )
+    stmt = select(models.AudioSegment).from_statement(select(deleted).add_cte(touched))
+    seg = (await db.execute(stmt)).scalars().first()
+    await db.commit()
     if not seg:   # already gone? fine.
         return Response(status_code=204)
     return seg
-    
-async def add_segment(db: AsyncSession, dream_id: str, seg: schemas.AudioSegmentCreate):
-    seg_id = uuid.UUID(str(seg.segment_id))     # ← client-supplied
-    stmt = select(models.AudioSegment).where(models.AudioSegment.id == seg_id)
 
-    if (existing := (await db.execute(stmt)).scalars().first()):
-        print("Segment already stored")
-        return existing                         # already stored – idempotent hit
+def _insert_segments(dream_id: str, rows: list[dict]):
+    """INSERT ... ON CONFLICT (id) DO NOTHING RETURNING for segment rows, with
+    the dream's version bump and segment counters folded into the same
+    statement as a CTE that only fires when something was inserted."""
+    inserted = (
+        insert(models.AudioSegment)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[models.AudioSegment.id])
+        .returning(*models.AudioSegment.__table__.c)
+        .cte("inserted")
+    )
+    touched = (
+        bump_version(dream_id)
+        .where(exists(select(inserted.c.id)))
+        .values(
+            segment_count=models.Dream.segment_count + select(func.count()).select_from(inserted).scalar_subquery(),
+            total_duration=models.Dream.total_duration + select(func.coalesce(func.sum(inserted.c.duration), 0.0)).scalar_subquery(),
+            last_segment_at=datetime.utcnow(),
+        )
+        .cte("touched")
+    )
+    return select(models.AudioSegment).from_statement(select(inserted).add_cte(touched))
 
-    segment = models.AudioSegment(
-        id=seg_id,
+def _segment_row(dream_id: str, seg: schemas.AudioSegmentCreate) -> dict:
+    return dict(
+        id=uuid.UUID(str(seg.segment_id)),      # ← client-supplied
         dream_id=uuid.UUID(dream_id),
         filename=seg.filename,
         duration=seg.duration,
         order=seg.order,
         s3_key=seg.s3_key,
+        transcription_status=models.TranscriptionStatus.pending,
     )
-    db.add(segment)
+
+async def add_segment(db: AsyncSession, dream_id: str, seg: schemas.AudioSegmentCreate):
+    row = _segment_row(dream_id, seg)
     try:
-        await db.commit()                       # first arrival
-    except IntegrityError:
-        await db.rollback()                     # late replay – treat as success
-    await db.refresh(segment)
+        segment = (await db.execute(_insert_segments(dream_id, [row]))).scalars().first()
+        await db.commit()
+    except IntegrityError as e:                 # FK: the dream doesn't exist
+        await db.rollback()
+        raise ValueError(f"Dream with id {dream_id} not found") from e
+
+    if segment is None:
+        print("Segment already stored")         # replay – idempotent hit
+        stmt = select(models.AudioSegment).where(models.AudioSegment.id == row["id"])
+        return (await db.execute(stmt)).scalars().first()
     print("Added segment.")
-    return segment
\ No newline at end of file
+    return segment
+
+async def add_segments(db: AsyncSession, dream_id: str, segs: list[schemas.AudioSegmentCreate]):
+    """Register many segments in one multi-row INSERT ... ON CONFLICT DO NOTHING.
+
+    Returns every requested segment in request order; ids that were already
+    stored are idempotent hits and come back as they are.
+    """
+    rows = {row["id"]: row for row in (_segment_row(dream_id, seg) for seg in segs)}
+    try:
+        inserted = (await db.execute(_insert_segments(dream_id, list(rows.values())))).scalars().all()
+        await db.commit()
+    except IntegrityError as e:                 # FK: the dream doesn't exist
+        await db.rollback()
+        raise ValueError(f"Dream with id {dream_id} not found") from e
+
+    by_id = {seg.id: seg for seg in inserted}
+    if missing := [seg_id for seg_id in rows if seg_id not in by_id]:
+        result = await db.execute(select(models.AudioSegment).where(models.AudioSegment.id.in_(missing)))
+        by_id.update({seg.id: seg for seg in result.scalars()})
+    print(f"Added {len(inserted)} of {len(rows)} segments.")
+    return [by_id[seg_id] for seg_id in rows if seg_id in by_id]
+
@@ -1,19 +1,208 @@
+from sqlalchemy import exc, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
+from fastapi import Request
+import asyncio
 import os
+import time
+import uuid
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
+# LISTEN needs a real session-level connection; set this to bypass PgBouncer
+DATABASE_DIRECT_URL = os.getenv("DATABASE_DIRECT_URL") or DATABASE_URL
+# optional streaming replica for read-only endpoints (get_read_db)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))                # seconds behind before we fall back
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "2"))
+# a client that wrote within this window reads from the primary
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+LAST_WRITE_COOKIE = "last_write"
 
-engine = create_async_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes", "on")
+
+
+# Per-process pool settings. Total Postgres connections are roughly
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW) x uvicorn workers, so size these together.
+POOL_SETTINGS = {
+    "pool_size":     int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow":  int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout":  float(os.getenv("DB_POOL_TIMEOUT", "30")),    # seconds to wait for a free connection
+    "pool_recycle":  int(os.getenv("DB_POOL_RECYCLE", "1800")),    # reconnect after this many seconds
+    "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+    # transaction-mode PgBouncer hands each transaction a different server
+    # connection, so prepared statements can't be cached or reused by name
+    "pgbouncer":     _env_flag("DB_PGBOUNCER"),
+}
+
+
+class PoolStats:
+    """How long checkouts waited for a connection, for /debug/pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.timeouts += timed_out
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait, 3),
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+
+def make_engine(url: str, settings: dict = POOL_SETTINGS, **kwargs):
+    """Async engine with the pool and asyncpg statement cache sized from ``settings``."""
+    connect_args = {}
+    if settings["pgbouncer"]:
+        connect_args.update(
+            statement_cache_size=0,                 # asyncpg's own cache
+            prepared_statement_cache_size=0,        # SQLAlchemy's asyncpg adapter cache
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+        )
+    else:
+        connect_args.update(
+            statement_cache_size=settings["statement_cache_size"],
+            prepared_statement_cache_size=settings["statement_cache_size"],
+        )
+    options = dict(
+        echo=False,
+        pool_pre_ping=True,
+        poolclass=TimedQueuePool,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_recycle=settings["pool_recycle"],
+        connect_args=connect_args,
+    )
+    options.update(kwargs)
+    return create_async_engine(url, **options)
+
+
+engine = make_engine(DATABASE_URL)
+# one long-lived LISTEN connection per process (events.EventBroker)
+listen_engine = engine if DATABASE_DIRECT_URL == DATABASE_URL else make_engine(
+    DATABASE_DIRECT_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0,
+)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_engine = make_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False) if read_engine else None
 
 Base = declarative_base()
 
+def pool_status(engine=engine) -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": POOL_SETTINGS["max_overflow"],
+        "timeout": POOL_SETTINGS["pool_timeout"],
+        "recycle": POOL_SETTINGS["pool_recycle"],
+        "pgbouncer": POOL_SETTINGS["pgbouncer"],
+        "waits": pool.wait_stats.snapshot(),
+    }
+
 async def get_db():
     async with async_session() as session:
+        yield session
+
+
+class ReplicaMonitor:
+    """Replica lag, re-checked at most every ``interval`` seconds.
+
+    Lag is zero while the replica has replayed everything it received (an
+    idle primary writes nothing, so the last replay timestamp goes stale),
+    otherwise the age of the last replayed transaction. Pointed at a server
+    that isn't a standby, it reports zero.
+    """
+
+    LAG_SQL = text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0"
+        " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )
+
+    def __init__(self, engine, max_lag: float, interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: float | None = None     # None: unknown or unreachable
+        self.checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def healthy(self) -> bool:
+        if time.monotonic() - self.checked_at >= self.interval:
+            async with self._lock:
+                if time.monotonic() - self.checked_at >= self.interval:   # another request may have refreshed it
+                    try:
+                        async with self.engine.connect() as conn:
+                            self.lag = float((await conn.execute(self.LAG_SQL)).scalar())
+                    except Exception as e:
+                        print("[database] replica lag check failed:", e)
+                        self.lag = None
+                    self.checked_at = time.monotonic()
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def status(self) -> dict:
+        return {
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag,
+            "healthy": self.lag is not None and self.lag <= self.max_lag,
+            "pool": pool_status(self.engine),
+        }
+
+
+replica = ReplicaMonitor(read_engine, REPLICA_MAX_LAG, REPLICA_LAG_CHECK_INTERVAL) if read_engine else None
+
+def wrote_recently(request: Request) -> bool:
+    """Whether this client made a write within the read-your-writes window."""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+async def get_read_db(request: Request):
+    """Session for read-only endpoints: the replica when it's configured and
+    caught up, the primary otherwise or right after this client wrote."""
+    if replica is None or wrote_recently(request) or not await replica.healthy():
+        async with async_session() as session:
+            yield session
+        return
+    async with read_session() as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""Per-dream push events fanned out across processes with Postgres LISTEN/NOTIFY.
+
+Any process (API or render worker) publishes with ``publish``; the NOTIFY is
+part of the caller's transaction, so subscribers only hear about committed
+changes. Every API process runs one ``EventBroker`` holding a single LISTEN
+connection and hands events to the SSE streams of that process.
+"""
+import asyncio
+import json
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import listen_engine
+
+CHANNEL = "dream_events"
+
+TRANSCRIPT_READY = "transcript_ready"
+TRANSCRIPT_FAILED = "transcript_failed"
+STATE_CHANGED = "state_changed"
+VIDEO_READY = "video_ready"
+
+
+async def publish(db: AsyncSession, dream_id: str | uuid.UUID, event: str, data: dict | None = None):
+    """Queue a NOTIFY on ``db``'s transaction; it is delivered when the caller commits."""
+    payload = json.dumps({
+        "dream_id": str(uuid.UUID(str(dream_id))),   # canonical lower-case form, as subscribers key it
+        "event": event,
+        "data": data or {},
+    }, default=str)
+    await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+class EventBroker:
+    """Fans NOTIFY payloads out to in-process subscribers, keyed by dream id."""
+
+    def __init__(self, queue_size: int = 100, check_interval: float = 15, reconnect_delay: float = 1):
+        self.queue_size = queue_size
+        self.check_interval = check_interval      # seconds between health checks of the LISTEN connection
+        self.reconnect_delay = reconnect_delay    # first retry delay, doubled up to a minute
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+        self.listeners: list = []   # callables run for every event in this process
+        self.reconnects = 0
+        self._conn = None
+        self._driver = None
+        self._lost = asyncio.Event()
+        self._watcher: asyncio.Task | None = None
+
+    async def start(self):
+        await self._listen()
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        if self._conn is not None:
+            try:
+                await self._driver.remove_listener(CHANNEL, self._on_notify)
+            except Exception:
+                pass                                # already gone
+            await self._conn.close()
+            self._conn = None
+
+    async def _listen(self):
+        self._lost.clear()
+        self._conn = await listen_engine.connect()
+        raw = await self._conn.get_raw_connection()
+        self._driver = raw.driver_connection
+        await self._driver.add_listener(CHANNEL, self._on_notify)
+        self._driver.add_termination_listener(self._on_terminated)
+
+    def _on_terminated(self, connection):
+        self._lost.set()
+
+    async def _healthy(self) -> bool:
+        try:
+            await asyncio.wait_for(self._driver.execute("SELECT 1"), self.check_interval)
+            return True
+        except Exception:
+            return False
+
+    async def _watch(self):
+        """Re-establish the LISTEN when its connection drops (the backend was
+        terminated, Postgres restarted, the network went away). NOTIFYs sent
+        while it was down are lost; SSE clients resync from GET /dreams/{id}."""
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                if await self._healthy():
+                    continue
+            print("[events] LISTEN connection lost; reconnecting")
+            delay = self.reconnect_delay
+            while True:
+                try:
+                    await self._conn.invalidate()
+                except Exception:
+                    pass
+                try:
+                    await self._listen()
+                    break
+                except Exception as e:
+                    print(f"[events] LISTEN reconnect failed, retrying in {delay:g}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+            self.reconnects += 1
+            print(f"[events] LISTEN connection re-established (reconnect #{self.reconnects})")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        event = json.loads(payload)
+        for listener in self.listeners:
+            listener(event)
+        for queue in self.subscribers.get(event["dream_id"], ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow consumer; it will resync from GET /dreams/{id}
+                pass
+
+    def subscribe(self, dream_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(dream_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, dream_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(dream_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[dream_id]
+
+
+broker = EventBroker()
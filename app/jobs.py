@@ -0,0 +1,257 @@
+"""Durable video job queue backed by the ``video_jobs`` table.
+
+Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of
+processes can pull from the queue without handing out the same job twice. A
+claimed job carries a lease that the worker extends with heartbeats; if the
+worker dies the lease runs out and another worker picks the job up again.
+"""
+import asyncio
+import contextlib
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import and_, case, cast, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, video
+from .database import async_session
+from .video_pipeline.orchestrator import VideoPipeline
+
+WORKER_CONFIG = video.CONFIG["worker"]
+
+ACTIVE_STATUSES = [models.VideoJobStatus.queued, models.VideoJobStatus.running]
+
+
+def db_now():
+    """Current time on the database clock, as naive UTC like our DateTime columns."""
+    return func.timezone("UTC", func.now())
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Producer side ----------------------------------------------------------
+
+async def enqueue_video_job(db: AsyncSession, dream_id: str, commit: bool = True) -> models.VideoJob | None:
+    """Queue a render for the dream. Returns None if one is already queued or running.
+
+    Pass ``commit=False`` to queue it inside the caller's transaction.
+    """
+    stmt = (
+        insert(models.VideoJob)
+        .values(
+            id=uuid.uuid4(),
+            dream_id=uuid.UUID(dream_id),
+            max_attempts=WORKER_CONFIG["max_attempts"],
+        )
+        .on_conflict_do_nothing(
+            index_elements=[models.VideoJob.dream_id],
+            index_where=models.VideoJob.status.in_(ACTIVE_STATUSES),
+        )
+        .returning(models.VideoJob)
+    )
+    job = (await db.execute(stmt)).scalars().first()
+    if commit:
+        await db.commit()
+    return job
+
+
+# Worker side ------------------------------------------------------------
+
+async def claim_video_job(db: AsyncSession, worker_id: str, lease_seconds: int) -> models.VideoJob | None:
+    """Atomically claim the oldest runnable job, or a running job whose lease expired."""
+    job = models.VideoJob
+    candidate = (
+        select(job.id)
+        .where(
+            or_(
+                and_(job.status == models.VideoJobStatus.queued, job.run_after <= db_now()),
+                and_(
+                    job.status == models.VideoJobStatus.running,
+                    job.lease_expires_at < db_now(),
+                    job.attempts < job.max_attempts,
+                ),
+            )
+        )
+        .order_by(job.run_after)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(job)
+        .where(job.id == candidate)
+        .values(
+            status=models.VideoJobStatus.running,
+            attempts=job.attempts + 1,
+            locked_by=worker_id,
+            heartbeat_at=db_now(),
+            lease_expires_at=db_now() + timedelta(seconds=lease_seconds),
+        )
+        .returning(job)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = (await db.execute(stmt)).scalars().first()
+    await db.commit()
+    return claimed
+
+
+async def heartbeat_video_job(db: AsyncSession, job_id: uuid.UUID, worker_id: str, lease_seconds: int) -> bool:
+    """Extend the lease. Returns False if the job is no longer ours."""
+    stmt = (
+        update(models.VideoJob)
+        .where(
+            models.VideoJob.id == job_id,
+            models.VideoJob.locked_by == worker_id,
+            models.VideoJob.status == models.VideoJobStatus.running,
+        )
+        .values(
+            heartbeat_at=db_now(),
+            lease_expires_at=db_now() + timedelta(seconds=lease_seconds),
+        )
+        .returning(models.VideoJob.id)
+    )
+    owned = (await db.execute(stmt)).first() is not None
+    await db.commit()
+    return owned
+
+
+async def complete_video_job(db: AsyncSession, job_id: uuid.UUID, worker_id: str):
+    await db.execute(
+        update(models.VideoJob)
+        .where(models.VideoJob.id == job_id, models.VideoJob.locked_by == worker_id)
+        .values(
+            status=models.VideoJobStatus.succeeded,
+            locked_by=None,
+            lease_expires_at=None,
+            finished_at=db_now(),
+        )
+    )
+    await db.commit()
+
+
+async def fail_video_job(db: AsyncSession, job_id: uuid.UUID, worker_id: str, error: str):
+    """Requeue with exponential backoff, or mark failed once attempts are used up."""
+    job = models.VideoJob
+    exhausted = job.attempts >= job.max_attempts
+    backoff = timedelta(seconds=WORKER_CONFIG["retry_backoff_seconds"]) * func.power(2, job.attempts - 1)
+    await db.execute(
+        update(job)
+        .where(job.id == job_id, job.locked_by == worker_id)
+        .values(
+            status=cast(
+                case((exhausted, models.VideoJobStatus.failed.value), else_=models.VideoJobStatus.queued.value),
+                job.status.type,
+            ),
+            run_after=case((exhausted, job.run_after), else_=db_now() + backoff),
+            finished_at=case((exhausted, db_now()), else_=None),
+            locked_by=None,
+            lease_expires_at=None,
+            last_error=error,
+        )
+    )
+    await db.commit()
+
+
+async def reap_video_jobs(db: AsyncSession) -> int:
+    """Fail running jobs whose lease expired on their last allowed attempt."""
+    result = await db.execute(
+        update(models.VideoJob)
+        .where(
+            models.VideoJob.status == models.VideoJobStatus.running,
+            models.VideoJob.lease_expires_at < db_now(),
+            models.VideoJob.attempts >= models.VideoJob.max_attempts,
+        )
+        .values(
+            status=models.VideoJobStatus.failed,
+            locked_by=None,
+            lease_expires_at=None,
+            finished_at=db_now(),
+            last_error="lease expired",
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def owns_video_job(db: AsyncSession, job_id: uuid.UUID, worker_id: str) -> bool:
+    """Whether the job is still ours. Locks the job row until the caller's
+    transaction ends, so no other worker can claim it before that commit."""
+    stmt = (
+        select(models.VideoJob.id)
+        .where(
+            models.VideoJob.id == job_id,
+            models.VideoJob.locked_by == worker_id,
+            models.VideoJob.status == models.VideoJobStatus.running,
+        )
+        .with_for_update()
+    )
+    return (await db.execute(stmt)).first() is not None
+
+
+async def _keep_lease(job_id: uuid.UUID, worker_id: str, render: asyncio.Task):
+    """Heartbeat until cancelled. A failed heartbeat is retried on the next
+    tick; once the job is no longer ours, ``render`` is cancelled."""
+    lease_seconds = WORKER_CONFIG["lease_seconds"]
+    while True:
+        await asyncio.sleep(WORKER_CONFIG["heartbeat_seconds"])
+        try:
+            async with async_session() as db:
+                owned = await heartbeat_video_job(db, job_id, worker_id, lease_seconds)
+        except Exception as e:
+            print(f"[jobs] Heartbeat for job {job_id} failed, retrying next tick: {e}")
+            continue
+        if not owned:
+            print(f"[jobs] Lost lease on job {job_id}; cancelling its render")
+            render.cancel()
+            return
+
+
+async def run_video_job(job: models.VideoJob, worker_id: str, pipeline: VideoPipeline | None = None):
+    """Render one claimed job, heartbeating for as long as it runs."""
+    async def owned(db: AsyncSession) -> bool:
+        return await owns_video_job(db, job.id, worker_id)
+
+    render = asyncio.create_task(video.create_video(str(job.dream_id), pipeline, owned=owned))
+    heartbeat = asyncio.create_task(_keep_lease(job.id, worker_id, render))
+    try:
+        await render
+    except asyncio.CancelledError:
+        if not heartbeat.done() or heartbeat.cancelled():
+            raise                               # we are being shut down
+        # lease lost: the job belongs to another worker now, leave its row alone
+        print(f"[jobs] Job {job.id} render stopped after losing the lease")
+    except Exception as e:
+        print(f"[jobs] Job {job.id} attempt {job.attempts} failed: {e}")
+        async with async_session() as db:
+            await fail_video_job(db, job.id, worker_id, str(e))
+    else:
+        async with async_session() as db:
+            await complete_video_job(db, job.id, worker_id)
+    finally:
+        heartbeat.cancel()
+
+
+async def run_worker(
+    worker_id: str | None = None,
+    pipeline: VideoPipeline | None = None,
+    stop: asyncio.Event | None = None,
+):
+    """Claim and render jobs one at a time until cancelled or ``stop`` is set."""
+    worker_id = worker_id or default_worker_id()
+    stop = stop or asyncio.Event()
+    print(f"[jobs] Worker {worker_id} polling for video jobs")
+    while not stop.is_set():
+        async with async_session() as db:
+            await reap_video_jobs(db)
+            job = await claim_video_job(db, worker_id, WORKER_CONFIG["lease_seconds"])
+        if job is None:
+            # sleep, but wake immediately on shutdown
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), WORKER_CONFIG["poll_interval_seconds"])
+            continue
+        await run_video_job(job, worker_id, pipeline)
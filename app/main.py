@@ -1,44 +1,167 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-import boto3
-from botocore.config import Config
-from datetime import timedelta
-import os
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import re
+import time
+import uuid
 
-from .database import get_db, Base, engine
-from . import crud, schemas, models, s3, tasks, transcribe, video
-from fastapi import BackgroundTasks
+from .database import (
+    get_db, get_read_db, pool_status, replica, async_session, read_session,
+    LAST_WRITE_COOKIE, READ_YOUR_WRITES_SECONDS,
+)
+from . import crud, schemas, models, s3, tasks, transcribe, video, jobs, events
+from .presign import presigner, sign_playlist, video_urls
+from .storage import storage
 
 app = FastAPI(title="Campfire API")
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
-    aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"],
-    region_name=os.environ["AWS_REGION"],
-    config=Config(signature_version='s3v4')
-)
-bucket_name = os.environ["S3_BUCKET"]
-
 
 # ─────────────────── Startup ───────────────────
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        # Auto‑create tables in dev; switch to Alembic migrations later
-        await conn.run_sync(Base.metadata.create_all)
+    # the schema is owned by Alembic: run `alembic upgrade head` before starting
+    await transcribe.runner.start()
+    events.broker.listeners.append(_invalidate_video_url)
+    await events.broker.start()
+
+def _invalidate_video_url(event: dict):
+    if event["event"] == events.VIDEO_READY and (key := event["data"].get("video_s3_key")):
+        video_urls.invalidate(key)
+    if event["event"] == events.VIDEO_READY and (key := event["data"].get("hls_playlist_key")):
+        hls_playlists.pop(key, None)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await events.broker.stop()
+    await transcribe.runner.stop()
+    storage.shutdown()
 
 # ─────────────────── Routes ───────────────────
 
-@app.get("/list-dreams/", response_model=list[schemas.DreamRead])
-async def list_dreams(db: AsyncSession = Depends(get_db)):
-    return await crud.list_dreams(db)
+@app.middleware("http")
+async def remember_writes(request: Request, call_next):
+    """Stamp clients that just wrote, so get_read_db sends their next reads
+    to the primary instead of a replica that may not have the write yet."""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(LAST_WRITE_COOKIE, f"{time.time():.3f}", max_age=int(READ_YOUR_WRITES_SECONDS) + 1)
+    return response
+
+@app.get("/debug/pool")
+async def debug_pool():
+    """Connection pool occupancy and checkout wait times for this process,
+    for Postgres and for the S3 thread pool."""
+    return {**pool_status(), "replica": replica.status() if replica else None, "s3": storage.stats()}
+
+MAX_PAGE_SIZE = 200
+
+@app.get("/list-dreams/", response_model=list[schemas.DreamSummary], response_model_exclude_unset=True)
+async def list_dreams(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    include: list[str] = Query([], description="Extra fields: segments, transcript, video_metadata"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Newest dreams first. Follow the X-Next-Cursor response header for the next page."""
+    fields = {f.strip() for value in include for f in value.split(",") if f.strip()}
+    if unknown := fields - crud.LIST_INCLUDES:
+        raise HTTPException(400, f"Unknown include: {', '.join(sorted(unknown))}")
+    try:
+        items, next_cursor = await crud.list_dreams(db, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+# declared before /dreams/{dream_id} so "search" isn't taken for an id
+@app.get("/dreams/search", response_model=list[schemas.DreamSearchResult], response_model_exclude_unset=True)
+async def search_dreams(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words, \"phrases\", OR, -excluded"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search titles and transcripts, best match first, with highlighted snippets."""
+    try:
+        items, next_cursor = await crud.search_dreams(db, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+def _export_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="seconds") + "Z"   # same as the JSON endpoints
+    return str(value)
+
+# declared before /dreams/{dream_id} too
+@app.get("/dreams/export.ndjson")
+async def export_dreams(
+    since: datetime | None = Query(None, description="Only dreams changed at or after this time"),
+    fields: list[str] = Query([], description=f"Only these fields (plus id): {', '.join(crud.DREAM_FIELDS)}"),
+    include: list[str] = Query([], description="Also export: segments"),
+):
+    """Every dream as newline-delimited JSON, streamed from a server-side
+    cursor in updated_at order. Resume an export with ``since``."""
+    picked = tuple(f.strip() for value in fields for f in value.split(",") if f.strip()) or crud.DREAM_FIELDS
+    extras = {f.strip() for value in include for f in value.split(",") if f.strip()}
+    if unknown := set(picked) - set(crud.DREAM_FIELDS):
+        raise HTTPException(400, f"Unknown field: {', '.join(sorted(unknown))}")
+    if unknown := extras - {"segments"}:
+        raise HTTPException(400, f"Unknown include: {', '.join(sorted(unknown))}")
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)   # stored as naive UTC
+
+    async def stream():
+        # its own session: the response outlives the request's dependencies.
+        # Bulk reads go to the replica when there is one.
+        async with (read_session or async_session)() as db:
+            async for batch in crud.export_dreams(db, picked, since, "segments" in extras):
+                yield "".join(json.dumps(item, default=_export_default) + "\n" for item in batch)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# ─────────────────── Conditional GET ───────────────────
+# Strong ETags derived from Dream.version, which every write bumps. A
+# matching If-None-Match is answered with one primary-key lookup.
+
+def dream_etag(dream_id: str, version: int, view: str) -> str:
+    return f'"{uuid.UUID(dream_id)}.{version}.{view}"'
+
+async def not_modified(db: AsyncSession, dream_id: str, view: str, if_none_match: str | None) -> Response | None:
+    """A 304 response if the client's copy is current, else None."""
+    if not if_none_match:
+        return None
+    version = await crud.get_dream_version(db, dream_id)
+    if version is None:
+        raise HTTPException(404, "Dream not found")
+    etag = dream_etag(dream_id, version, view)
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
 
 @app.get("/dreams/{dream_id}/transcript", response_model=schemas.TranscriptRead)
-async def get_dream_transcript(dream_id: str, db: AsyncSession = Depends(get_db)):
-    dream = await crud.get_dream(db, dream_id)
+async def get_dream_transcript(
+    dream_id: str,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := await not_modified(db, dream_id, "transcript", if_none_match)):
+        return cached
+    dream = await crud.get_dream(db, dream_id, "transcript")
     if not dream:
         raise HTTPException(404, "Dream not found")
+    await crud.fill_stale_transcript(db, dream)
+    response.headers["ETag"] = dream_etag(dream_id, dream.version, "transcript")
     return schemas.TranscriptRead(transcript=dream.transcript)
 
 @app.patch("/dreams/{dream_id}", response_model=schemas.DreamRead)
@@ -56,26 +179,78 @@ async def create_dream(
     db_dream = await crud.create_dream(db, dream)
     return db_dream
 
-@app.get("/dreams/{dream_id}", response_model=schemas.DreamRead)
-async def read_dream(dream_id: str, db: AsyncSession = Depends(get_db)):
-    dream = await crud.get_dream(db, dream_id)
+@app.get("/dreams/{dream_id}", response_model=schemas.DreamView, response_model_exclude_unset=True)
+async def read_dream(
+    dream_id: str,
+    response: Response,
+    fields: list[str] = Query([], description=f"Only these fields (plus id): {', '.join(crud.DREAM_FIELDS)}"),
+    include: list[str] = Query([], description="With fields=, also return: segments"),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """The whole dream with its segments, or with ``?fields=`` just the named
+    columns (and the segments only when ``?include=segments``)."""
+    picked = tuple(sorted({f.strip() for value in fields for f in value.split(",") if f.strip()}))
+    extras = {f.strip() for value in include for f in value.split(",") if f.strip()}
+    if unknown := set(picked) - set(crud.DREAM_FIELDS):
+        raise HTTPException(400, f"Unknown field: {', '.join(sorted(unknown))}")
+    if unknown := extras - {"segments"}:
+        raise HTTPException(400, f"Unknown include: {', '.join(sorted(unknown))}")
+
+    view = "dream"
+    if picked:
+        view = "+".join(picked + (("segments",) if extras else ()))
+    if (cached := await not_modified(db, dream_id, view, if_none_match)):
+        return cached
+    dream = await crud.get_dream(db, dream_id, crud.dream_loader(picked, bool(extras)) if picked else "full")
     if not dream:
         raise HTTPException(404, "Dream not found")
-    return dream
+    if not picked or "transcript" in picked:
+        await crud.fill_stale_transcript(db, dream)
+    response.headers["ETag"] = dream_etag(dream_id, dream.version, view)
+    if not picked:
+        return dream
+    # only what was loaded; touching an unloaded column would lazy-load it
+    return {"id": dream.id, **{f: getattr(dream, f) for f in picked}, **({"segments": dream.segments} if extras else {})}
 
-@app.post("/dreams/{dream_id}/segments/", response_model=schemas.AudioSegmentRead)
+@app.post("/dreams/{dream_id}/segments/", response_model=schemas.AudioSegmentRead, status_code=202)
 async def add_segment(
     dream_id: str,
     seg: schemas.AudioSegmentCreate,
     db: AsyncSession = Depends(get_db),
 ):
-    db_seg = await crud.add_segment(db, dream_id, seg)
-    # synchronous transcription (await Deepgram)
-    transcript = await transcribe.transcribe_segment(dream_id, str(db_seg.id), db_seg.filename)
-    if transcript:
-        db_seg.transcript = ((db_seg.transcript or "") + " " + transcript).strip()
+    try:
+        db_seg = await crud.add_segment(db, dream_id, seg)
+    except ValueError:
+        raise HTTPException(404, "Dream not found")
+    # transcription runs in the background; poll GET /segments/ for transcription_status
+    if db_seg.transcription_status == models.TranscriptionStatus.pending:
+        transcribe.runner.submit(dream_id, str(db_seg.id), db_seg.filename)
     return db_seg
 
+MAX_SEGMENT_BATCH = 100
+
+@app.post("/dreams/{dream_id}/segments/batch", response_model=list[schemas.AudioSegmentRead], status_code=202)
+async def add_segments(
+    dream_id: str,
+    segs: list[schemas.AudioSegmentCreate],
+    db: AsyncSession = Depends(get_db),
+):
+    """Register many segments in one round trip; replays of known ids are no-ops."""
+    if not segs:
+        return []
+    if len(segs) > MAX_SEGMENT_BATCH:
+        raise HTTPException(413, f"At most {MAX_SEGMENT_BATCH} segments per batch")
+    try:
+        db_segs = await crud.add_segments(db, dream_id, segs)
+    except ValueError:
+        raise HTTPException(404, "Dream not found")
+    # the runner's worker pool bounds how many of these hit Deepgram at once
+    for db_seg in db_segs:
+        if db_seg.transcription_status == models.TranscriptionStatus.pending:
+            transcribe.runner.submit(dream_id, str(db_seg.id), db_seg.filename)
+    return db_segs
+
 @app.delete("/dreams/{dream_id}/segments/{segment_id}")
 async def delete_segment(dream_id: str, segment_id: str, db: AsyncSession = Depends(get_db)):
     seg = await crud.get_segment(db, dream_id, segment_id)
@@ -84,7 +259,7 @@ async def delete_segment(dream_id: str, segment_id: str, db: AsyncSession = Depe
     s3_key = seg.s3_key  # capture before deletion/commit
     await crud.remove_segment(db, dream_id, segment_id)
     try:
-        s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
+        await storage.delete_object(s3_key)   # on the S3 thread pool, off the event loop
     except Exception as e:
         print("S3 delete error", e)
     return {"status": "deleted"}
@@ -92,77 +267,194 @@ async def delete_segment(dream_id: str, segment_id: str, db: AsyncSession = Depe
 @app.post("/dreams/{dream_id}/finish")
 async def finish_dream(
     dream_id: str,
-    background: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
-    dream = await crud.get_dream(db, dream_id)
+    dream = await crud.get_dream(db, dream_id, "finish")
     if not dream:
         raise HTTPException(404, "Dream not found")
-    # schedule video generation (no-op currently)
-    background.add_task(video.create_video, dream_id)
-    full_transcript = " ".join([(seg.transcript or "").strip() for seg in dream.segments]).strip()
-    await crud.set_state(db, dream_id, models.DreamState.completed)
-    return {"transcript": full_transcript}
+    full_transcript = dream.transcript
+    if dream.transcript_version is None:        # segments changed since it was last joined
+        full_transcript = await crud.refresh_transcript(db, dream_id)
+    # the state change, its history row and NOTIFY, and the render job commit
+    # together, so a completed dream always has a job; a worker process picks
+    # it up (see app/jobs.py)
+    if not await crud.transition_state(db, dream_id, dream.state, models.DreamState.completed, commit=False):
+        raise HTTPException(409, "Dream state changed concurrently; retry")
+    await jobs.enqueue_video_job(db, dream_id, commit=False)
+    await db.commit()
+    return {"transcript": full_transcript or ""}
 
 
 @app.post("/dreams/{dream_id}/video-complete/")
 async def video_complete(dream_id: str, db: AsyncSession = Depends(get_db)):
-    await crud.set_state(db, dream_id, models.DreamState.completed)
-    # TODO: push notification to the user (WebSocket / APNs / FCM)
+    state = await crud.get_dream_state(db, dream_id)
+    if state is None:
+        raise HTTPException(404, "Dream not found")
+    await events.publish(db, dream_id, events.VIDEO_READY)
+    if not await crud.transition_state(db, dream_id, state, models.DreamState.completed):
+        raise HTTPException(409, "Dream state changed concurrently; retry")
     return {"status": "ok"}
 
+SSE_KEEPALIVE_SECONDS = 15
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.get("/dreams/{dream_id}/events")
+async def dream_events(dream_id: str, db: AsyncSession = Depends(get_db)):
+    """Server-sent events for one dream: transcript_ready, transcript_failed,
+    state_changed and video_ready. Events published by any API or worker
+    process arrive here through Postgres LISTEN/NOTIFY."""
+    dream = await crud.get_dream(db, dream_id, "state")
+    if not dream:
+        raise HTTPException(404, "Dream not found")
+    key = str(uuid.UUID(dream_id))
+    # subscribe before taking the snapshot so nothing slips in between
+    queue = events.broker.subscribe(key)
+    snapshot = {"state": dream.state.value, "video_s3_key": dream.video_s3_key}
+
+    async def stream():
+        try:
+            yield _sse(events.STATE_CHANGED, snapshot)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event["event"], event["data"])
+        finally:
+            events.broker.unsubscribe(key, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/dreams/{dream_id}/segments/", response_model=list[schemas.AudioSegmentRead])
 async def list_segments(
     dream_id: str,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    dream = await crud.get_dream(db, dream_id)
+    if (cached := await not_modified(db, dream_id, "segments", if_none_match)):
+        return cached
+    dream = await crud.get_dream(db, dream_id, "segments")
     if not dream:
         raise HTTPException(404, "Dream not found")
+    response.headers["ETag"] = dream_etag(dream_id, dream.version, "segments")
     return dream.segments
 
 @app.get("/dreams/{dream_id}/video-url/")
-async def get_video_url(dream_id: str, db: AsyncSession = Depends(get_db)):
-    """Get a pre-signed URL for downloading the video"""
-    dream = await crud.get_dream(db, dream_id)
+async def get_video_url(dream_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    """Get a pre-signed URL for downloading the video, and the HLS playlist
+    URL when the render produced one"""
+    dream = await crud.get_dream(db, dream_id, "video")
     if not dream:
         raise HTTPException(404, "Dream not found")
     
     if not dream.video_s3_key:
         raise HTTPException(404, "Video not found for this dream")
     
-    # Generate pre-signed URL valid for 1 hour
-    presigned_url = s3_client.generate_presigned_url(
-        'get_object',
-        Params={
-            'Bucket': bucket_name,
-            'Key': dream.video_s3_key,
-        },
-        ExpiresIn=3600  # 1 hour
-    )
+    # Same URL is reused until it is close to expiry
+    presigned_url, expires_in = video_urls.get(dream.video_s3_key)
+    response.headers["Cache-Control"] = f"private, max-age={expires_in - video_urls.min_remaining}"
+    
+    hls_key = (dream.video_metadata or {}).get("hls_playlist_key")
     
     return {
         "video_url": presigned_url,
-        "expires_in": 3600,
+        "playlist_url": str(request.url_for("get_hls_playlist", dream_id=dream_id)) if hls_key else None,
+        "expires_in": expires_in,
         "metadata": dream.video_metadata
     }
 
-@app.post("/dreams/{dream_id}/upload-url/")
-async def get_upload_url(dream_id: str, filename: str):
-    """Generate a pre-signed URL for uploading to S3"""
-    s3_key = f"dreams/{dream_id}/{filename}"
+HLS_PLAYLIST_CACHE_SIZE = 1000
+hls_playlists: dict[str, str] = {}   # playlist key -> playlist as uploaded; dropped on video_ready
+
+@app.get("/dreams/{dream_id}/hls/playlist.m3u8")
+async def get_hls_playlist(dream_id: str, db: AsyncSession = Depends(get_read_db)):
+    """The dream's HLS playlist with each segment pointing at a pre-signed S3 URL"""
+    dream = await crud.get_dream(db, dream_id, "video")
+    if not dream:
+        raise HTTPException(404, "Dream not found")
+    key = (dream.video_metadata or {}).get("hls_playlist_key")
+    if not key:
+        raise HTTPException(404, "HLS playlist not found for this dream")
     
-    # Generate pre-signed URL valid for 10 minutes
-    presigned_url = s3_client.generate_presigned_url(
-        'put_object',
-        Params={
-            'Bucket': bucket_name,
-            'Key': s3_key,
-        },
-        ExpiresIn=600  # 10 minutes
+    playlist = hls_playlists.get(key)
+    if playlist is None:
+        playlist = (await storage.get_object(key)).decode()
+        if len(hls_playlists) >= HLS_PLAYLIST_CACHE_SIZE:
+            hls_playlists.pop(next(iter(hls_playlists)))
+        hls_playlists[key] = playlist
+    signed, expires_in = sign_playlist(playlist, key.rsplit("/", 1)[0] + "/", video_urls)
+    return Response(
+        signed,
+        media_type=video.HLS_CONTENT_TYPES[".m3u8"],
+        headers={"Cache-Control": f"private, max-age={expires_in - video_urls.min_remaining}"},
     )
-    
+
+@app.get("/dreams/{dream_id}/artifacts", response_model=list[schemas.Artifact])
+async def get_artifacts(dream_id: str, db: AsyncSession = Depends(get_read_db)):
+    """Scene images and voiceovers uploaded so far by the render, with
+    pre-signed download URLs, so the client can preview before the video is ready"""
+    if await crud.get_dream_state(db, dream_id) is None:
+        raise HTTPException(404, "Dream not found")
+    prefix = video.artifact_prefix(dream_id)
+    artifacts = []
+    for key in await storage.list_keys(prefix):
+        kind, _, name = key[len(prefix):].partition("/")
+        scene = re.match(r"scene_(\d+)", name)
+        url, expires_in = video_urls.get(key)
+        artifacts.append({
+            "kind": kind,
+            "scene_id": int(scene.group(1)) if scene else None,
+            "s3_key": key,
+            "download_url": url,
+            "expires_in": expires_in,
+        })
+    return sorted(artifacts, key=lambda a: (a["kind"], a["scene_id"] or 0))
+
+UPLOAD_URL_EXPIRES = 600      # 10 minutes
+DOWNLOAD_URL_EXPIRES = 3600   # 1 hour
+MAX_URL_BATCH = 100
+
+def presign_upload(dream_id: str, filename: str) -> dict:
+    s3_key = f"dreams/{dream_id}/{filename}"
+    presigned_url = presigner.presign_put(s3_key, UPLOAD_URL_EXPIRES)
     return {
         "upload_url": presigned_url,
         "s3_key": s3_key
-    }
\ No newline at end of file
+    }
+
+@app.post("/dreams/{dream_id}/upload-url/")
+async def get_upload_url(dream_id: str, filename: str):
+    """Generate a pre-signed URL for uploading to S3"""
+    return presign_upload(dream_id, filename)
+
+@app.post("/dreams/{dream_id}/upload-urls", response_model=list[schemas.UploadUrl])
+async def get_upload_urls(dream_id: str, req: schemas.UploadUrlsRequest):
+    """Pre-signed upload URLs for many files in one call"""
+    if len(req.filenames) > MAX_URL_BATCH:
+        raise HTTPException(413, f"At most {MAX_URL_BATCH} filenames per call")
+    return [{"filename": filename, **presign_upload(dream_id, filename)} for filename in req.filenames]
+
+@app.get("/dreams/{dream_id}/segment-urls", response_model=list[schemas.SegmentUrl])
+async def get_segment_urls(dream_id: str, db: AsyncSession = Depends(get_read_db)):
+    """Pre-signed download URLs for every segment of a dream, in order"""
+    segments = await crud.list_segments(db, dream_id)
+    if segments is None:
+        raise HTTPException(404, "Dream not found")
+    return [
+        {
+            "segment_id": seg.id,
+            "filename": seg.filename,
+            "s3_key": seg.s3_key,
+            "download_url": s3.presign_download(seg.s3_key, DOWNLOAD_URL_EXPIRES),
+            "expires_in": DOWNLOAD_URL_EXPIRES,
+        }
+        for seg in segments
+    ]
\ No newline at end of file
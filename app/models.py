@@ -1,8 +1,8 @@
 import enum, uuid
 from datetime import datetime
-from sqlalchemy import Column, Enum, DateTime, String, Text, Float, Integer, ForeignKey, JSON
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Enum, DateTime, String, Text, Float, Integer, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 from .database import Base
 
@@ -11,16 +11,60 @@ class DreamState(str, enum.Enum):
     completed = "completed"
     video_generated = "video_generated"
 
+    def can_transition_to(self, target: "DreamState") -> bool:
+        return target in DREAM_TRANSITIONS[self]
+
+# Legal moves; anything else is a bug in the caller. Staying in the same state
+# is always allowed (re-finishing, a failed re-render).
+DREAM_TRANSITIONS = {
+    DreamState.draft:           {DreamState.draft, DreamState.completed},
+    DreamState.completed:       {DreamState.completed, DreamState.video_generated},
+    DreamState.video_generated: {DreamState.video_generated, DreamState.completed},   # re-finish → re-render
+}
+
+class TranscriptionStatus(str, enum.Enum):
+    pending = "pending"
+    processing = "processing"
+    completed = "completed"
+    failed = "failed"
+
+class VideoJobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+# text search configuration for dreams.search_vector and the queries against it
+SEARCH_CONFIG = "english"
+
 class Dream(Base):
     __tablename__ = "dreams"
 
     id        = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     created   = Column(DateTime, default=datetime.utcnow, nullable=False)
     title     = Column(String(255), nullable=False)
-    transcript= Column(Text)
+    transcript= Column(Text)   # segment transcripts in segment order; see crud.ordered_transcript
+    # dreams.version the transcript was last derived at; NULL while stale, i.e.
+    # a segment changed since (crud.refresh_transcript derives it again)
+    transcript_version = Column(Integer, nullable=True)
     state     = Column(Enum(DreamState), default=DreamState.draft, nullable=False)
     video_s3_key = Column(String(512), nullable=True)
     video_metadata = Column(JSON, nullable=True)
+    # bumped by every write that changes what GET /dreams/{id} returns; drives ETags
+    version   = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # maintained by crud's segment insert/delete statements, so list views
+    # never have to touch the segments table
+    segment_count   = Column(Integer, default=0, nullable=False)
+    total_duration  = Column(Float, default=0.0, nullable=False)   # seconds
+    last_segment_at = Column(DateTime, nullable=True)
+    # full-text search over title (weight A) and transcript (weight B); kept by
+    # Postgres, deferred so ordinary loads never fetch it
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(transcript, '')), 'B')",
+        persisted=True,
+    )))
 
     segments  = relationship(
         "AudioSegment",
@@ -28,7 +72,23 @@ class Dream(Base):
         cascade="all, delete-orphan",
         order_by="AudioSegment.order",
     )
-    
+
+    __table_args__ = (
+        # list_dreams keyset pagination: ORDER BY created DESC, id DESC
+        Index("ix_dreams_created_id", "created", "id"),
+        # export_dreams: ORDER BY updated_at, id, optionally from ?since=
+        Index("ix_dreams_updated_at_id", "updated_at", "id"),
+        # finished dreams still waiting for a rendered video
+        Index(
+            "ix_dreams_awaiting_video",
+            "created",
+            postgresql_where=(state == DreamState.completed) & video_s3_key.is_(None),
+        ),
+        # GET /dreams/search: tsvector match, and pg_trgm fuzzy title match
+        Index("ix_dreams_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_dreams_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+    )
+
 
 class AudioSegment(Base):
     __tablename__ = "segments"
@@ -40,5 +100,61 @@ class AudioSegment(Base):
     order    = Column(Integer, nullable=False)
     s3_key   = Column(String(512), nullable=False)
     transcript = Column(Text, nullable=True)
+    transcription_status = Column(
+        Enum(TranscriptionStatus), default=TranscriptionStatus.pending, nullable=False
+    )
+    transcription_claimed_at = Column(DateTime, nullable=True)   # when a runner moved it to processing
+
+    dream    = relationship("Dream", back_populates="segments")
+
+    __table_args__ = (
+        # segments of a dream in order (selectinload, list_segments) and the FK cascade
+        Index("ix_segments_dream_id_order", "dream_id", "order"),
+        # TranscriptionRunner.recover; only the few unfinished rows are indexed
+        Index(
+            "ix_segments_transcription_open",
+            "transcription_status",
+            postgresql_where=transcription_status.in_([TranscriptionStatus.pending, TranscriptionStatus.processing]),
+        ),
+    )
+
+
+class VideoJob(Base):
+    """A durable unit of render work, claimed by workers with a lease."""
+    __tablename__ = "video_jobs"
+
+    id           = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dream_id     = Column(UUID(as_uuid=True), ForeignKey("dreams.id", ondelete="CASCADE"), nullable=False)
+    status       = Column(Enum(VideoJobStatus), default=VideoJobStatus.queued, nullable=False)
+    attempts     = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after    = Column(DateTime, default=datetime.utcnow, nullable=False)   # earliest (re)try time
+    locked_by    = Column(String(255), nullable=True)                          # worker id holding the lease
+    lease_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error   = Column(Text, nullable=True)
+    created      = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at  = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # claim scan: oldest runnable job first
+        Index("ix_video_jobs_status_run_after", "status", "run_after"),
+        # at most one live job per dream, so repeated /finish calls don't stack renders
+        Index(
+            "uq_video_jobs_active_dream",
+            "dream_id",
+            unique=True,
+            postgresql_where=status.in_([VideoJobStatus.queued, VideoJobStatus.running]),
+        ),
+    )
+
+
+class DreamStateHistory(Base):
+    """Append-only log of state transitions, written by crud.transition_state."""
+    __tablename__ = "dream_state_history"
 
-    dream    = relationship("Dream", back_populates="segments")
\ No newline at end of file
+    id         = Column(Integer, primary_key=True, autoincrement=True)
+    dream_id   = Column(UUID(as_uuid=True), ForeignKey("dreams.id", ondelete="CASCADE"), nullable=False, index=True)
+    from_state = Column(Enum(DreamState), nullable=False)
+    to_state   = Column(Enum(DreamState), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
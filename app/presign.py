@@ -0,0 +1,152 @@
+"""Local SigV4 query-string presigner for S3.
+
+botocore's ``generate_presigned_url`` rebuilds the request model and
+re-derives the signing key on every call. The presign-heavy endpoints only
+ever need GET/PUT URLs for one bucket, so we build the canonical request
+directly and cache the derived key, which only changes once a day (or when
+the credentials rotate). Output matches botocore byte for byte; see
+test_files/test_presign.py.
+"""
+import hashlib
+import hmac
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import quote
+
+import boto3
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+SERVICE = "s3"
+
+# bucket names that can be used as a virtual-hosted DNS label
+_VIRTUAL_HOST_BUCKET = re.compile(r"^[a-z0-9][a-z0-9-]{1,61}[a-z0-9]$")
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+@lru_cache(maxsize=16)
+def signing_key(secret_key: str, datestamp: str, region: str, service: str = SERVICE) -> bytes:
+    """The SigV4 derived key for one day/region/service; cached across calls."""
+    key = ("AWS4" + secret_key).encode()
+    for part in (datestamp, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+class Presigner:
+    def __init__(self, bucket: str, region: str, credentials):
+        self.bucket = bucket
+        self.region = region
+        self.credentials = credentials      # botocore Credentials; may be refreshable
+        # same addressing botocore picks for s3v4 presigned URLs
+        if _VIRTUAL_HOST_BUCKET.match(bucket):
+            self.host = f"{bucket}.s3.amazonaws.com"
+            self.path_prefix = "/"
+        else:
+            self.host = "s3.amazonaws.com" if region == "us-east-1" else f"s3.{region}.amazonaws.com"
+            self.path_prefix = f"/{_uri_encode(bucket)}/"
+
+    @classmethod
+    def from_env(cls) -> "Presigner":
+        region = os.getenv("AWS_REGION", "us-west-2")
+        session = boto3.Session(region_name=region)
+        return cls(os.environ["S3_BUCKET"], region, session.get_credentials())
+
+    def presign(self, method: str, key: str, expires: int, now: datetime | None = None) -> str:
+        creds = self.credentials.get_frozen_credentials()
+        now = now or datetime.utcnow()
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = amz_date[:8]
+        scope = f"{datestamp}/{self.region}/{SERVICE}/aws4_request"
+
+        path = self.path_prefix + _uri_encode(key, safe="-_.~/")
+        params = {
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": f"{creds.access_key}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": "host",
+        }
+        if creds.token:
+            params["X-Amz-Security-Token"] = creds.token
+        canonical_query = "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(params.items()))
+
+        canonical_request = "\n".join([
+            method, path, canonical_query, f"host:{self.host}\n", "host", "UNSIGNED-PAYLOAD",
+        ])
+        string_to_sign = "\n".join([
+            ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        key_bytes = signing_key(creds.secret_key, datestamp, self.region)
+        signature = hmac.new(key_bytes, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        # the URL keeps botocore's parameter order; only the canonical form is sorted
+        query = "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in params.items())
+        return f"https://{self.host}{path}?{query}&X-Amz-Signature={signature}"
+
+    def presign_get(self, key: str, expires: int = 3600) -> str:
+        return self.presign("GET", key, expires)
+
+    def presign_put(self, key: str, expires: int = 600) -> str:
+        return self.presign("PUT", key, expires)
+
+
+class PresignedUrlCache:
+    """In-process TTL cache of GET URLs, keyed by S3 key.
+
+    Hands back the same URL until fewer than ``min_remaining`` seconds of its
+    validity are left, so repeated polls get identical, cacheable responses
+    and we don't re-sign on every request. Bounded LRU.
+    """
+
+    def __init__(self, presigner: Presigner, expires: int, min_remaining: int, max_entries: int = 10_000):
+        self.presigner = presigner
+        self.expires = expires
+        self.min_remaining = min_remaining
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, int]] = OrderedDict()   # key -> (url, expires_at)
+
+    def get(self, key: str) -> tuple[str, int]:
+        """Return ``(url, seconds_until_expiry)``."""
+        now = int(time.time())                  # X-Amz-Date has whole-second resolution
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] - now > self.min_remaining:
+            self._entries.move_to_end(key)
+            return entry[0], entry[1] - now
+
+        url = self.presigner.presign("GET", key, self.expires, now=datetime.utcfromtimestamp(now))
+        self._entries[key] = (url, now + self.expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return url, self.expires
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+
+def sign_playlist(playlist: str, prefix: str, urls: PresignedUrlCache) -> tuple[str, int]:
+    """Swap each segment line of an HLS playlist for a pre-signed GET URL.
+
+    Segment lines are relative to the playlist, so ``prefix`` is the key of
+    the playlist's folder. Returns ``(playlist, seconds_until_first_expiry)``.
+    """
+    lines, expires_in = [], urls.expires
+    for line in playlist.splitlines():
+        if line and not line.startswith("#"):
+            line, remaining = urls.get(prefix + line)
+            expires_in = min(expires_in, remaining)
+        lines.append(line)
+    return "\n".join(lines) + "\n", expires_in
+
+
+presigner = Presigner.from_env()
+
+VIDEO_URL_EXPIRES = 3600        # 1 hour
+VIDEO_URL_MIN_REMAINING = 300   # re-sign once less than 5 minutes are left
+video_urls = PresignedUrlCache(presigner, VIDEO_URL_EXPIRES, VIDEO_URL_MIN_REMAINING)
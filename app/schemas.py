@@ -15,6 +15,7 @@ class AudioSegmentCreate(AudioSegmentBase):
 class AudioSegmentRead(AudioSegmentBase):
     segment_id: Union[UUID, str] = Field(alias="id")
     transcript: Optional[str] = None
+    transcription_status: str = "pending"   # pending | processing | completed | failed
 
     class Config:
         orm_mode = True
@@ -37,10 +38,16 @@ class DreamRead(DreamBase):
     id: Union[UUID, str]
     created: datetime
     transcript: Optional[str] = None
+    transcript_version: Optional[int] = None   # version the transcript was derived at
     state: str
     segments: List[AudioSegmentRead] = []
     video_s3_key: Optional[str] = None
     video_metadata: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    segment_count: Optional[int] = None
+    total_duration: Optional[float] = None     # seconds
+    last_segment_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -49,5 +56,80 @@ class DreamRead(DreamBase):
             UUID: lambda v: str(v)
         }
 
+class DreamView(BaseModel):
+    """GET /dreams/{id}: every field by default, or only those picked with
+    ``?fields=`` (plus id); the rest are left out of the response."""
+    id: Union[UUID, str]
+    title: Optional[str] = None
+    created: Optional[datetime] = None
+    transcript: Optional[str] = None
+    transcript_version: Optional[int] = None   # version the transcript was derived at
+    state: Optional[str] = None
+    segments: Optional[List[AudioSegmentRead]] = None
+    video_s3_key: Optional[str] = None
+    video_metadata: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    segment_count: Optional[int] = None
+    total_duration: Optional[float] = None     # seconds
+    last_segment_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        json_encoders = {
+            datetime: lambda dt: dt.isoformat(timespec="seconds") + "Z",
+            UUID: lambda v: str(v)
+        }
+
+class DreamSummary(DreamBase):
+    """List-view dream. The heavy fields are only filled in when asked for
+    with ``?include=`` and are left out of the response otherwise."""
+    id: Union[UUID, str]
+    created: datetime
+    state: str
+    video_s3_key: Optional[str] = None
+    version: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    segment_count: Optional[int] = None
+    total_duration: Optional[float] = None     # seconds
+    last_segment_at: Optional[datetime] = None
+    transcript: Optional[str] = None
+    video_metadata: Optional[Dict[str, Any]] = None
+    segments: Optional[List[AudioSegmentRead]] = None
+
+    class Config:
+        orm_mode = True
+        json_encoders = {
+            datetime: lambda dt: dt.isoformat(timespec="seconds") + "Z",
+            UUID: lambda v: str(v)
+        }
+
+class DreamSearchResult(DreamSummary):
+    score: float                    # 0..1, higher is better
+    snippet: Optional[str] = None   # transcript excerpt, matches wrapped in <b></b>
+
 class TranscriptRead(BaseModel):
-    transcript: str
\ No newline at end of file
+    transcript: str
+
+class UploadUrlsRequest(BaseModel):
+    filenames: List[str]
+
+class UploadUrl(BaseModel):
+    filename: str
+    upload_url: str
+    s3_key: str
+
+class SegmentUrl(BaseModel):
+    segment_id: Union[UUID, str]
+    filename: Optional[str] = None
+    s3_key: str
+    download_url: str
+    expires_in: int
+
+class Artifact(BaseModel):
+    kind: str                   # "images" or "voiceovers"
+    scene_id: Optional[int] = None
+    s3_key: str
+    download_url: str
+    expires_in: int
+
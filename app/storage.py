@@ -0,0 +1,233 @@
+"""The process-wide S3 client and its async facade.
+
+boto3 is blocking, so every S3 call made from async code goes through
+``storage`` and runs on a dedicated, bounded thread pool instead of the event
+loop or asyncio's shared default executor. A slow upload then only ties up an
+S3 thread, never unrelated requests. ``stats()`` reports how long calls wait
+for a free thread, which is the signal to raise ``s3.max_workers``.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from .video_pipeline.config import CONFIG
+
+S3_CONFIG = CONFIG["s3"]
+BUCKET = os.environ["S3_BUCKET"]
+REGION = os.getenv("AWS_REGION", "us-west-2")
+
+# boto3 clients are thread-safe; one client means one connection pool
+client = boto3.client(
+    "s3",
+    region_name=REGION,
+    config=Config(
+        signature_version="s3v4",
+        max_pool_connections=S3_CONFIG["max_pool_connections"],
+        retries={"max_attempts": S3_CONFIG["max_attempts"], "mode": "adaptive"},
+        tcp_keepalive=True,
+    ),
+)
+
+transfer_config = TransferConfig(
+    multipart_threshold=S3_CONFIG["multipart_threshold_mb"] * 1024 * 1024,
+    max_concurrency=S3_CONFIG["transfer_concurrency"],
+)
+
+MIN_PART_SIZE = 5 * 1024 * 1024     # S3's floor for every part but the last
+
+
+class Storage:
+    """Async wrappers over ``client`` for one bucket."""
+
+    def __init__(self, client, bucket: str, max_workers: int):
+        self.client = client
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="s3")
+        self.calls = 0
+        self.queued = 0                 # submitted, waiting for a thread
+        self.running = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()    # counters are touched from the loop and the pool threads
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking client call on the S3 pool."""
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        def call():
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.calls += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def upload_file(self, path: str, key: str, content_type: str | None = None):
+        extra = {"ContentType": content_type} if content_type else None
+        await self.run(self.client.upload_file, path, self.bucket, key, ExtraArgs=extra, Config=transfer_config)
+
+    def multipart_upload(self, key: str, content_type: str | None = None) -> "MultipartUpload":
+        """A writable sink that uploads to ``key`` part by part; use with ``async with``."""
+        return MultipartUpload(
+            self, key, content_type,
+            part_size=S3_CONFIG["stream_part_size_mb"] * 1024 * 1024,
+            concurrency=S3_CONFIG["transfer_concurrency"],
+        )
+
+    async def get_object(self, key: str) -> bytes:
+        def read():
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return await self.run(read)
+
+    async def list_keys(self, prefix: str) -> list[str]:
+        def keys():
+            pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix)
+            return [obj["Key"] for page in pages for obj in page.get("Contents", ())]
+        return await self.run(keys)
+
+    async def delete_object(self, key: str):
+        await self.run(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pool_connections": S3_CONFIG["max_pool_connections"],
+            "running": self.running,
+            "queued": self.queued,
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_wait_ms": round(1000 * self.total_wait / self.calls, 3) if self.calls else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait, 3),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class MultipartUpload:
+    """Uploads the bytes written to it as S3 multipart parts while they arrive.
+
+    Bytes are cut into ``part_size`` parts, and up to ``concurrency`` of them
+    are uploaded at once on the S3 pool. ``write`` waits for a free slot, so
+    a producer that is faster than the upload is slowed to upload speed and
+    memory stays bounded. The upload starts on the first write. Leaving the
+    ``async with`` block normally completes the object. Any failure aborts
+    the upload, whether it is raised in the block or while completing, so no
+    parts are left behind.
+    """
+
+    def __init__(self, storage: Storage, key: str, content_type: str | None = None,
+                 part_size: int = MIN_PART_SIZE, concurrency: int = 4):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.upload_id: str | None = None
+        self.size = 0
+        self._buffer = bytearray()
+        self._etags: dict[int, str] = {}      # part number -> ETag
+        self._tasks: list[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.complete()
+        else:
+            await self.abort()
+
+    async def write(self, data: bytes):
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._send(part)
+
+    async def _start(self):
+        extra = {"ContentType": self.content_type} if self.content_type else {}
+        response = await self.storage.run(
+            self.storage.client.create_multipart_upload, Bucket=self.storage.bucket, Key=self.key, **extra
+        )
+        self.upload_id = response["UploadId"]
+
+    async def _send(self, body: bytes):
+        if self.upload_id is None:
+            await self._start()
+        for task in self._tasks:
+            if task.done() and task.exception():
+                raise task.exception()       # stop feeding an upload that has already failed
+        await self._slots.acquire()
+        number = len(self._tasks) + 1
+
+        async def upload():
+            try:
+                response = await self.storage.run(
+                    self.storage.client.upload_part,
+                    Bucket=self.storage.bucket, Key=self.key, UploadId=self.upload_id,
+                    PartNumber=number, Body=body,
+                )
+                self._etags[number] = response["ETag"]
+            finally:
+                self._slots.release()
+
+        self._tasks.append(asyncio.create_task(upload()))
+
+    async def complete(self):
+        try:
+            if self._buffer or not self._tasks:   # the last part may be short; an empty object still needs one
+                part = bytes(self._buffer)
+                self._buffer.clear()
+                await self._send(part)
+            await asyncio.gather(*self._tasks)
+            await self.storage.run(
+                self.storage.client.complete_multipart_upload,
+                Bucket=self.storage.bucket, Key=self.key, UploadId=self.upload_id,
+                MultipartUpload={"Parts": [
+                    {"PartNumber": number, "ETag": self._etags[number]} for number in sorted(self._etags)
+                ]},
+            )
+        except BaseException:
+            # a failed part or completion must not leave stored parts behind
+            await self.abort()
+            raise
+
+    async def abort(self):
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.upload_id is None:
+            return
+        try:
+            await self.storage.run(
+                self.storage.client.abort_multipart_upload,
+                Bucket=self.storage.bucket, Key=self.key, UploadId=self.upload_id,
+            )
+        except Exception as e:
+            # the parts stay stored until an AbortIncompleteMultipartUpload lifecycle rule removes them
+            print(f"[storage] failed to abort multipart upload {self.key}: {e}")
+
+
+storage = Storage(client, BUCKET, S3_CONFIG["max_workers"])
\ No newline at end of file
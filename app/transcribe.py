@@ -1,21 +1,12 @@
-import os, uuid
-import boto3
+import asyncio, os, uuid
+from datetime import timedelta
 import httpx
-from botocore.config import Config
-from sqlalchemy import update, select, func, literal
+from sqlalchemy import func, update, select
+from . import crud, events, models
 from .database import async_session
-from .models import AudioSegment, Dream
-
-bucket_name = os.getenv("S3_BUCKET")
-region      = os.getenv("AWS_REGION", "us-west-2")
-
-s3_client = boto3.client(
-    "s3",
-    region_name=region,
-    config=Config(signature_version="s3v4"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-)
+from .presign import presigner
+from .models import AudioSegment, TranscriptionStatus
+from .video_pipeline.config import CONFIG
 
 DG_ENDPOINT = "https://api.deepgram.com/v1/listen"
 DG_HEADERS  = {
@@ -35,40 +26,167 @@ async def deepgram_transcribe(presigned_url: str) -> str | None:
 
 async def generate_presigned_get(dream_id: str, filename: str) -> str:
     key = f"dreams/{dream_id}/{filename}"
-    return s3_client.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": bucket_name, "Key": key},
-        ExpiresIn=3600,
-    )
+    return presigner.presign_get(key, 3600)
+
+async def _claim_segment(dream_id: str, segment_id: str) -> bool:
+    """Move a pending segment to processing; False if another runner has it."""
+    async with async_session() as session:
+        result = await session.execute(
+            update(AudioSegment)
+            .where(
+                AudioSegment.id == uuid.UUID(segment_id),
+                AudioSegment.transcription_status == TranscriptionStatus.pending,
+            )
+            .values(
+                transcription_status=TranscriptionStatus.processing,
+                transcription_claimed_at=func.timezone("UTC", func.now()),
+            )
+            .returning(AudioSegment.id)
+        )
+        claimed = result.first() is not None
+        if claimed:
+            await session.execute(crud.bump_version(dream_id))
+        await session.commit()
+    return claimed
+
+async def _mark_failed(dream_id: str, segment_id: str):
+    async with async_session() as session:
+        await session.execute(
+            update(AudioSegment)
+            .where(AudioSegment.id == uuid.UUID(segment_id))
+            .values(transcription_status=TranscriptionStatus.failed)
+        )
+        await session.execute(crud.bump_version(dream_id))
+        await events.publish(session, dream_id, events.TRANSCRIPT_FAILED, {"segment_id": segment_id})
+        await session.commit()
 
 async def transcribe_segment(dream_id: str, segment_id: str, filename: str):
     """Fetch transcript from Deepgram and persist to DB."""
     presigned_url = await generate_presigned_get(dream_id, filename)
     transcript = await deepgram_transcribe(presigned_url)
     if not transcript:
+        await _mark_failed(dream_id, segment_id)
         return None
 
-    # Persist transcript
+    # Persist transcript; the dream transcript is marked stale and joined on read
     async with async_session() as session:
-        # update segment transcript
-        await session.execute(
-            update(AudioSegment)
-            .where(AudioSegment.id == uuid.UUID(segment_id))
-            .values(transcript=transcript)
-        )
-        # append to dream transcript atomically
-        await session.execute(
-            update(Dream)
-            .where(Dream.id == uuid.UUID(dream_id))
-            .values(
-                transcript=func.trim(
-                    func.concat(
-                        func.coalesce(Dream.transcript, literal("")),
-                        literal(" "),
-                        literal(transcript)
-                    )
+        if not await crud.store_segment_transcript(session, dream_id, segment_id, transcript):
+            return None                         # segment was deleted meanwhile
+        await events.publish(session, dream_id, events.TRANSCRIPT_READY, {
+            "segment_id": segment_id,
+            "transcript": transcript,
+        })
+        await session.commit()
+    return transcript
+
+
+class TranscriptionRunner:
+    """Runs segment transcriptions in the background with bounded concurrency.
+
+    ``POST /segments`` only persists the segment and calls ``submit``; a fixed
+    pool of workers drains the queue, so no request holds a DB connection
+    while Deepgram is working.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int, claim_timeout: float, recover_interval: float):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.claim_timeout = claim_timeout
+        self.recover_interval = recover_interval
+        self.queued: set[str] = set()       # segment ids in the queue, so recovery doesn't add them twice
+        self.workers: list[asyncio.Task] = []
+
+    def submit(self, dream_id: str, segment_id: str, filename: str) -> bool:
+        """Queue a segment; False if the queue is full (it stays pending for recovery)."""
+        if segment_id in self.queued:
+            return True
+        try:
+            self.queue.put_nowait((dream_id, segment_id, filename))
+        except asyncio.QueueFull:
+            print(f"[transcribe] Queue full, segment {segment_id} left pending")
+            return False
+        self.queued.add(segment_id)
+        return True
+
+    async def start(self):
+        self.workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        self.workers.append(asyncio.create_task(self._recover_periodically()))
+
+    async def stop(self):
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def recover(self):
+        """Re-queue segments left pending by a restart or a full queue, after
+        resetting to pending the ones whose runner died mid-transcription
+        (processing for longer than ``claim_timeout``)."""
+        async with async_session() as session:
+            cutoff = func.timezone("UTC", func.now()) - timedelta(seconds=self.claim_timeout)
+            orphaned = (
+                update(AudioSegment)
+                .where(
+                    AudioSegment.transcription_status == TranscriptionStatus.processing,
+                    (AudioSegment.transcription_claimed_at < cutoff) | AudioSegment.transcription_claimed_at.is_(None),
                 )
+                .values(transcription_status=TranscriptionStatus.pending, transcription_claimed_at=None)
+                .returning(AudioSegment.dream_id)
+                .cte("orphaned")
             )
-        )
-        await session.commit()
-    return transcript
\ No newline at end of file
+            touched = (
+                update(models.Dream)
+                .where(models.Dream.id.in_(select(orphaned.c.dream_id)))
+                .values(version=models.Dream.version + 1, updated_at=func.timezone("UTC", func.now()))
+                .returning(models.Dream.id)
+                .cte("touched")
+            )
+            reset = (await session.execute(select(touched.c.id))).all()
+            await session.commit()
+            if reset:
+                print(f"[transcribe] Reset orphaned transcriptions in {len(reset)} dream(s) to pending")
+
+            result = await session.execute(
+                select(AudioSegment.dream_id, AudioSegment.id, AudioSegment.filename)
+                .where(AudioSegment.transcription_status == TranscriptionStatus.pending)
+                .order_by(AudioSegment.transcription_claimed_at, AudioSegment.id)
+                .limit(self.queue_size or None)     # no more than the queue can take
+            )
+            pending = result.all()
+        for dream_id, segment_id, filename in pending:
+            if not self.submit(str(dream_id), str(segment_id), filename):
+                break
+
+    async def _recover_periodically(self):
+        while True:
+            try:
+                await self.recover()
+            except Exception as e:
+                print(f"[transcribe] Recovery failed: {e}")
+            await asyncio.sleep(self.recover_interval)
+
+    async def _work(self):
+        while True:
+            dream_id, segment_id, filename = await self.queue.get()
+            self.queued.discard(segment_id)
+            try:
+                if await _claim_segment(dream_id, segment_id):
+                    await transcribe_segment(dream_id, segment_id, filename)
+            except Exception as e:
+                print(f"[transcribe] Segment {segment_id} failed: {e}")
+                try:
+                    await _mark_failed(dream_id, segment_id)
+                except Exception as e:
+                    print(f"[transcribe] Could not mark segment {segment_id} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+
+runner = TranscriptionRunner(
+    concurrency=CONFIG["transcription"]["concurrency"],
+    queue_size=CONFIG["transcription"]["queue_size"],
+    claim_timeout=CONFIG["transcription"]["claim_timeout_seconds"],
+    recover_interval=CONFIG["transcription"]["recover_interval_seconds"],
+)
+
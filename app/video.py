@@ -1,16 +1,17 @@
 """Video generation module using the integrated pipeline."""
 import asyncio
-import os
 import json
+import uuid
 from pathlib import Path
+from typing import Awaitable, Callable
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import crud, models
+from . import crud, events, models
 from .database import async_session
+from .presign import video_urls
+from .storage import storage
 from .video_pipeline.orchestrator import VideoPipeline
-import boto3
-from botocore.config import Config
 import yaml
 
 
@@ -19,76 +20,188 @@ config_path = Path(__file__).parent / "config.yaml"
 with open(config_path, 'r') as f:
     CONFIG = yaml.safe_load(f)
 
-# Initialize S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
-    aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"],
-    region_name=os.environ["AWS_REGION"],
-    config=Config(signature_version='s3v4')
-)
-bucket_name = os.environ["S3_BUCKET"]
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
 
 
-async def create_video(dream_id: str):
-    """Generate a video for the given dream and upload to S3."""
+async def upload_hls(dream_id: str, playlist_path: str) -> str:
+    """Upload the playlist folder to dreams/{id}/hls/; returns the playlist's key."""
+    hls_dir = Path(playlist_path).parent
+    prefix = f"dreams/{dream_id}/hls/"
+    await asyncio.gather(*(
+        storage.upload_file(str(path), prefix + path.name, content_type=HLS_CONTENT_TYPES.get(path.suffix))
+        for path in sorted(hls_dir.iterdir())
+    ))
+    return prefix + Path(playlist_path).name
+
+
+ARTIFACT_CONTENT_TYPES = {
+    ".png": "image/png",
+    ".mp3": "audio/mpeg",
+}
+
+
+def artifact_prefix(dream_id: str) -> str:
+    # canonical lower-case id, as the worker passes it, whatever case the client sent
+    return f"dreams/{uuid.UUID(str(dream_id))}/artifacts/"
+
+
+class ArtifactUploader:
+    """``on_artifact`` callback for the pipeline.
+
+    Each scene image and voiceover is uploaded to
+    dreams/{id}/artifacts/{images|voiceovers}/ on its own task as soon as the
+    pipeline writes it, so GET /dreams/{id}/artifacts can list it while
+    later stages are still running. A failed preview upload is logged but
+    does not fail the render.
+    """
+
+    def __init__(self, dream_id: str):
+        self.dream_id = dream_id
+        self.prefix = artifact_prefix(dream_id)
+        self.tasks: list[asyncio.Task] = []
+
+    def __call__(self, path: Path):
+        self.tasks.append(asyncio.create_task(self._upload(path)))
+
+    async def _upload(self, path: Path):
+        key = f"{self.prefix}{path.parent.name}/{path.name}"
+        try:
+            await storage.upload_file(str(path), key, content_type=ARTIFACT_CONTENT_TYPES.get(path.suffix))
+        except Exception as e:
+            print(f"[video.create_video] Artifact upload failed for dream {self.dream_id}: {key}: {e}")
+
+    async def wait(self):
+        await asyncio.gather(*self.tasks)
+
+
+async def _still_owned(
+    db: AsyncSession,
+    owned: Callable[[AsyncSession], Awaitable[bool]] | None,
+    dream_id: str,
+    release: bool = True,
+) -> bool:
+    """Run the caller's ownership check, if any. The check locks the job row;
+    ``release`` ends that transaction straight away so the lock isn't held
+    across an upload."""
+    if owned is None:
+        return True
+    if not await owned(db):
+        print(f"[video.create_video] Job for dream {dream_id} was taken over; dropping this render")
+        await db.rollback()
+        return False
+    if release:
+        await db.commit()
+    return True
+
+
+async def create_video(
+    dream_id: str,
+    pipeline: VideoPipeline | None = None,
+    owned: Callable[[AsyncSession], Awaitable[bool]] | None = None,
+):
+    """Generate a video for the given dream and upload to S3.
+
+    Pass a shared ``pipeline`` to run under its stage concurrency limits. A
+    job worker passes ``owned``, which checks the job is still its own. It is
+    checked before the upload and again, holding the job row lock, in the
+    transaction that records the video. A render whose job was taken over
+    stops without writing anything.
+    """
     
     # Create a new database session for this background task
     async with async_session() as db:
         try:
             print(f"[video.create_video] Starting video generation for dream {dream_id}")
             
-            # Get dream data
-            dream = await crud.get_dream(db, dream_id)
+            # Get dream data; the transcript is kept in segment order by crud
+            dream = await crud.get_dream(db, dream_id, "finish")
             if not dream:
                 print(f"[video.create_video] Dream {dream_id} not found")
                 return
             
-            # Build full transcript from segments
-            full_transcript = " ".join([
-                (seg.transcript or "").strip() 
-                for seg in dream.segments
-            ]).strip()
+            full_transcript = dream.transcript
+            if dream.transcript_version is None:
+                full_transcript = await crud.refresh_transcript(db, dream_id)
             
             if not full_transcript:
                 print(f"[video.create_video] No transcript available for dream {dream_id}")
-                await crud.set_state(db, dream_id, models.DreamState.completed)
+                await crud.transition_state(db, dream_id, dream.state, models.DreamState.completed)
                 return
             
-            # Also update the dream's transcript field
-            dream.transcript = full_transcript
-            await db.commit()
-            
             # Generate video using the pipeline
-            pipeline = VideoPipeline()
-            video_path, cost_estimate, metadata = await pipeline.generate_video(
-                full_transcript, 
-                dream_id
-            )
-            
-            # Upload video to S3
+            pipeline = pipeline or VideoPipeline()
             s3_key = f"dreams/{dream_id}/video.mp4"
-            print(f"[video.create_video] Uploading video to S3: {s3_key}")
-            
-            with open(video_path, 'rb') as f:
-                s3_client.upload_file(
-                    video_path,
-                    bucket_name,
-                    s3_key,
-                    ExtraArgs={'ContentType': 'video/mp4'}
+            artifacts = ArtifactUploader(dream_id)
+            if CONFIG["pipeline"]["video_compilation"].get("output_mode", "file") == "stream":
+                # ffmpeg's output is uploaded part by part while it encodes;
+                # a failed render aborts the upload
+                print(f"[video.create_video] Streaming video to S3: {s3_key}")
+                async with storage.multipart_upload(s3_key, content_type='video/mp4') as sink:
+                    video_path, cost_estimate, metadata = await pipeline.generate_video(
+                        full_transcript,
+                        dream_id,
+                        output_sink=sink,
+                        on_artifact=artifacts
+                    )
+            else:
+                video_path, cost_estimate, metadata = await pipeline.generate_video(
+                    full_transcript, 
+                    dream_id,
+                    on_artifact=artifacts
                 )
+                
+                if not await _still_owned(db, owned, dream_id):
+                    return
+                
+                # Upload video to S3
+                print(f"[video.create_video] Uploading video to S3: {s3_key}")
+                
+                await storage.upload_file(video_path, s3_key, content_type='video/mp4')
             
-            # Update dream with video information
-            dream.video_s3_key = s3_key
-            dream.video_metadata = {
-                "generated_at": datetime.utcnow().isoformat(),
-                "cost_estimate": cost_estimate,
-                "metadata": metadata,
-                "transcript_length": len(full_transcript),
-                "num_segments": len(dream.segments)
-            }
-            dream.state = models.DreamState.video_generated
-            await db.commit()
+            # the local files are removed below, so let the preview uploads finish
+            await artifacts.wait()
+            
+            if not await _still_owned(db, owned, dream_id):
+                return
+            
+            hls_key = None
+            if metadata.get("hls_playlist"):
+                print(f"[video.create_video] Uploading HLS playlist to S3: dreams/{dream_id}/hls/")
+                hls_key = await upload_hls(dream_id, metadata["hls_playlist"])
+            
+            # the job row stays locked until transition_state commits
+            if not await _still_owned(db, owned, dream_id, release=False):
+                return
+            
+            # Record the video and move completed -> video_generated in one
+            # conditional UPDATE; loses cleanly if the dream moved meanwhile
+            await events.publish(db, dream_id, events.VIDEO_READY, {
+                "state": models.DreamState.video_generated.value,
+                "video_s3_key": s3_key,
+                "hls_playlist_key": hls_key,
+            })
+            moved = await crud.transition_state(
+                db, dream_id,
+                models.DreamState.completed, models.DreamState.video_generated,
+                video_s3_key=s3_key,
+                video_metadata={
+                    "generated_at": datetime.utcnow().isoformat(),
+                    "cost_estimate": cost_estimate,
+                    "metadata": metadata,
+                    "transcript_length": len(full_transcript),
+                    "num_segments": dream.segment_count,
+                    "hls_playlist_key": hls_key,
+                },
+            )
+            if not moved:
+                print(f"[video.create_video] Dream {dream_id} left 'completed' during the render; not recording video")
+                return
+            # API processes drop their cached URL when they hear video_ready;
+            # this covers a create_video running in-process
+            video_urls.invalidate(s3_key)
             
             # Clean up local files
             output_dir = Path(CONFIG["storage"]["local_path"]) / dream_id
@@ -97,17 +210,21 @@ async def create_video(dream_id: str):
                 shutil.rmtree(output_dir)
             
             print(f"[video.create_video] ✅ Video generation complete for dream {dream_id}")
-            print(f"[video.create_video] S3 URL: s3://{bucket_name}/{s3_key}")
+            print(f"[video.create_video] S3 URL: s3://{storage.bucket}/{s3_key}")
             print(f"[video.create_video] Cost estimate: ${cost_estimate:.4f}")
             
         except Exception as e:
             print(f"[video.create_video] ❌ Error generating video for dream {dream_id}: {str(e)}")
             # Update dream state to indicate failure
-            dream = await crud.get_dream(db, dream_id)
-            if dream:
-                dream.state = models.DreamState.completed
-                dream.video_metadata = {
-                    "error": str(e),
-                    "failed_at": datetime.utcnow().isoformat()
-                }
-                await db.commit()
\ No newline at end of file
+            await db.rollback()
+            state = await crud.get_dream_state(db, dream_id)
+            if state is not None:
+                await crud.transition_state(
+                    db, dream_id, state, models.DreamState.completed,
+                    video_metadata={
+                        "error": str(e),
+                        "failed_at": datetime.utcnow().isoformat()
+                    },
+                )
+            # Let the job runner decide whether to retry
+            raise
\ No newline at end of file
@@ -2,7 +2,7 @@ import asyncio
 import tempfile
 import os
 from pathlib import Path
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, List, Callable, Optional
 from openai import AsyncOpenAI
 import logging
 import time
@@ -13,7 +13,12 @@ from .models import ScenesData
 
 logger = logging.getLogger("uvicorn")
 
-async def generate_audio_with_transcripts(scenes_data: ScenesData, output_dir: Path) -> Tuple[Dict[int, Dict], float]:
+async def generate_audio_with_transcripts(
+    scenes_data: ScenesData,
+    output_dir: Path,
+    on_artifact: Optional[Callable[[Path], None]] = None
+) -> Tuple[Dict[int, Dict], float]:
+    # on_artifact is called with each voiceover path as soon as it is saved
     config = CONFIG["pipeline"]["audio_generation"]
     client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     
@@ -50,6 +55,8 @@ async def generate_audio_with_transcripts(scenes_data: ScenesData, output_dir: P
         audio_path = voiceovers_dir / f"scene_{scene_id:02d}_voiceover.mp3"
         with open(audio_path, 'wb') as f:
             f.write(result["audio_data"])
+        if on_artifact:
+            on_artifact(audio_path)
         
         # Save transcription data
         transcription_path = transcriptions_dir / f"scene_{scene_id:02d}_transcription.txt"
@@ -1,7 +1,7 @@
 import asyncio
 import base64
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Callable, Optional
 import aiohttp
 from openai import AsyncOpenAI
 import logging
@@ -29,20 +29,25 @@ IMAGE_PRICING = {
     }
 }
 
-async def generate_images(scenes_data: ScenesData, output_dir: Path) -> Tuple[List[Path], float]:
+async def generate_images(
+    scenes_data: ScenesData,
+    output_dir: Path,
+    on_artifact: Optional[Callable[[Path], None]] = None
+) -> Tuple[List[Path], float]:
+    # on_artifact is called with each image path as soon as it is saved
     config = CONFIG["pipeline"]["image_generation"]
     model = config["model"]
     
     if model == "dall-e-2":
-        return await generate_dalle2_images(scenes_data, output_dir)
+        return await generate_dalle2_images(scenes_data, output_dir, on_artifact)
     elif model == "dall-e-3":
-        return await generate_dalle3_images(scenes_data, output_dir)
+        return await generate_dalle3_images(scenes_data, output_dir, on_artifact)
     elif model == "gpt-image-1":
-        return await generate_gpt_image_1_images(scenes_data, output_dir)
+        return await generate_gpt_image_1_images(scenes_data, output_dir, on_artifact)
     else:
         raise ValueError(f"Unknown image model: {model}")
 
-async def generate_dalle2_images(scenes_data: ScenesData, output_dir: Path) -> Tuple[List[Path], float]:
+async def generate_dalle2_images(scenes_data: ScenesData, output_dir: Path, on_artifact=None) -> Tuple[List[Path], float]:
     config = CONFIG["pipeline"]["image_generation"]
     client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     
@@ -83,6 +88,8 @@ async def generate_dalle2_images(scenes_data: ScenesData, output_dir: Path) -> T
                 f.write(image_data)
             
             image_paths.append(image_path)
+            if on_artifact:
+                on_artifact(image_path)
             total_cost += cost
             logger.info(f"  [Images] Scene {scene_id} image saved ({len(image_data)/1024:.1f} KB)")
     
@@ -111,7 +118,7 @@ async def generate_single_dalle2_image(client: AsyncOpenAI, scene_id: int, promp
         logger.error(f"  [Images] Prompt was: {prompt[:100]}...")
         raise
 
-async def generate_dalle3_images(scenes_data: ScenesData, output_dir: Path) -> Tuple[List[Path], float]:
+async def generate_dalle3_images(scenes_data: ScenesData, output_dir: Path, on_artifact=None) -> Tuple[List[Path], float]:
     config = CONFIG["pipeline"]["image_generation"]
     client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     
@@ -149,6 +156,8 @@ async def generate_dalle3_images(scenes_data: ScenesData, output_dir: Path) -> T
                 f.write(image_data)
             
             image_paths.append(image_path)
+            if on_artifact:
+                on_artifact(image_path)
             total_cost += cost
     
     return image_paths, total_cost
@@ -168,7 +177,7 @@ async def generate_single_dalle3_image(client: AsyncOpenAI, scene_id: int, promp
         "cost_usd": IMAGE_PRICING["dall-e-3"][quality]
     }
 
-async def generate_gpt_image_1_images(scenes_data: ScenesData, output_dir: Path) -> Tuple[List[Path], float]:
+async def generate_gpt_image_1_images(scenes_data: ScenesData, output_dir: Path, on_artifact=None) -> Tuple[List[Path], float]:
     config = CONFIG["pipeline"]["image_generation"]
     client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     
@@ -208,6 +217,8 @@ async def generate_gpt_image_1_images(scenes_data: ScenesData, output_dir: Path)
             f.write(base64.b64decode(img_b64))
         
         image_paths.append(image_path)
+        if on_artifact:
+            on_artifact(image_path)
         
         # Calculate cost
         usage = response.usage
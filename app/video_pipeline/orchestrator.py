@@ -1,6 +1,7 @@
 import asyncio
+import contextlib
 from pathlib import Path
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, Callable
 import json
 import time
 import logging
@@ -10,16 +11,52 @@ from .models import ScenesData
 from .dream_parser import parse_dream
 from .image_generator import generate_images
 from .audio_generator import generate_audio_with_transcripts
-from .video_compiler import compile_video
+from .video_compiler import compile_video, package_hls
 
 logger = logging.getLogger("uvicorn")
 
+STAGES = ("parse_dream", "generate_images", "generate_audio", "compile_video")
+
+class StageLimits:
+    """Per-stage concurrency caps, shared by every pipeline run in a process.
+
+    The provider-bound stages (parse, images, audio) and the ffmpeg compile
+    stage get separate pools, so a burst of renders can keep API calls in
+    flight without running more ffmpeg processes than the box has cores for.
+    A limit of None leaves that stage unbounded.
+    """
+    def __init__(self, limits: Optional[Dict[str, Optional[int]]] = None):
+        limits = limits or {}
+        unknown = set(limits) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+        self.limits = {stage: limits.get(stage) for stage in STAGES}
+        self._semaphores = {
+            stage: asyncio.Semaphore(limit)
+            for stage, limit in self.limits.items()
+            if limit
+        }
+
+    def __call__(self, stage: str):
+        return self._semaphores.get(stage) or contextlib.nullcontext()
+
 class VideoPipeline:
-    def __init__(self):
+    def __init__(self, limits: Optional[StageLimits] = None):
         self.config = CONFIG["pipeline"]
         self.storage_config = CONFIG["storage"]
+        self.limits = limits or StageLimits()
     
-    async def generate_video(self, dream_text: str, job_id: str) -> Tuple[Path, float, Dict[str, Any]]:
+    async def generate_video(
+        self,
+        dream_text: str,
+        job_id: str,
+        output_sink=None,
+        on_artifact: Optional[Callable[[Path], None]] = None
+    ) -> Tuple[Optional[Path], float, Dict[str, Any]]:
+        """Run every stage for one dream. With an ``output_sink`` the final
+        video is streamed into it (see ``compile_video``) and the returned
+        path is None. ``on_artifact`` is called with each scene image and
+        voiceover path as soon as it is written."""
         pipeline_start = time.time()
         logger.info(f"[Job {job_id[:8]}] Starting video generation pipeline")
         
@@ -32,7 +69,8 @@ class VideoPipeline:
         # Stage 1: Parse dream into scenes
         logger.info(f"[Job {job_id[:8]}] Stage 1: Parsing dream text ({len(dream_text)} chars)")
         stage1_start = time.time()
-        scenes_data, parse_cost = await parse_dream(dream_text)
+        async with self.limits("parse_dream"):
+            scenes_data, parse_cost = await parse_dream(dream_text)
         stage1_time = time.time() - stage1_start
         logger.info(f"[Job {job_id[:8]}] ✓ Stage 1 complete in {stage1_time:.1f}s - Generated {len(scenes_data.scenes)} scenes (${parse_cost:.4f})")
         
@@ -52,11 +90,16 @@ class VideoPipeline:
         logger.info(f"[Job {job_id[:8]}] Stage 2&3: Generating images and audio in parallel")
         parallel_start = time.time()
         
-        image_task = generate_images(scenes_data, output_dir)
-        audio_task = generate_audio_with_transcripts(scenes_data, output_dir)
+        async def image_task():
+            async with self.limits("generate_images"):
+                return await generate_images(scenes_data, output_dir, on_artifact)
+        
+        async def audio_task():
+            async with self.limits("generate_audio"):
+                return await generate_audio_with_transcripts(scenes_data, output_dir, on_artifact)
         
         (image_paths, image_cost), (audio_data, audio_cost) = await asyncio.gather(
-            image_task, audio_task
+            image_task(), audio_task()
         )
         
         parallel_time = time.time() - parallel_start
@@ -70,17 +113,25 @@ class VideoPipeline:
         # Stage 4: Compile video
         logger.info(f"[Job {job_id[:8]}] Stage 4: Compiling video with kinetic subtitles")
         stage4_start = time.time()
-        video_path = await compile_video(
-            scenes_data=scenes_data,
-            image_paths=image_paths,
-            audio_data=audio_data,
-            output_dir=output_dir
-        )
+        async with self.limits("compile_video"):
+            video_path = await compile_video(
+                scenes_data=scenes_data,
+                image_paths=image_paths,
+                audio_data=audio_data,
+                output_dir=output_dir,
+                output_sink=output_sink,
+                compile_slots=self.limits.limits["compile_video"]
+            )
+            hls = self.config["video_compilation"].get("hls") or {}
+            if hls.get("enabled") and video_path is None:
+                logger.warning(f"[Job {job_id[:8]}] HLS needs output_mode 'file'; skipping it for this streamed render")
+            elif hls.get("enabled"):
+                metadata["hls_playlist"] = str(await package_hls(video_path, output_dir / "hls", hls["segment_seconds"]))
         stage4_time = time.time() - stage4_start
         logger.info(f"[Job {job_id[:8]}] ✓ Stage 4 complete in {stage4_time:.1f}s")
         
         metadata["total_cost"] = round(total_cost, 4)
-        metadata["video_path"] = str(video_path)
+        metadata["video_path"] = str(video_path) if video_path else None
         
         # Add config parameters used for generation
         metadata["config"] = {
@@ -3,7 +3,7 @@ import subprocess
 import tempfile
 import os
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 import logging
 import time
@@ -13,6 +13,19 @@ from .models import ScenesData
 
 logger = logging.getLogger("uvicorn")
 
+# fragmented MP4 can be written front to back, so it works on a pipe
+FRAGMENTED_MP4_FLAGS = 'frag_keyframe+empty_moov+default_base_moof'
+STREAM_CHUNK_BYTES = 1024 * 1024
+HLS_PLAYLIST = 'playlist.m3u8'
+ENCODE_ARGS = [
+    '-c:v', 'libx264',
+    '-preset', 'medium',
+    '-crf', '23',
+    '-pix_fmt', 'yuv420p',
+    '-c:a', 'aac',
+    '-b:a', '192k',
+]
+
 SUBTITLE_STYLES = {
     "modern": {
         "fontname": "Arial Black",
@@ -72,11 +85,83 @@ async def compile_video(
     scenes_data: ScenesData,
     image_paths: List[Path],
     audio_data: Dict[int, Dict],
-    output_dir: Path
-) -> Path:
+    output_dir: Path,
+    output_sink=None,
+    compile_slots: Optional[int] = None
+) -> Optional[Path]:
+    """Render the final video to ``output_dir/final_video.mp4`` and return its path.
+
+    If an ``output_sink`` is given (anything with an async ``write(bytes)``,
+    e.g. ``storage.multipart_upload``), ffmpeg writes fragmented MP4 to stdout.
+    The chunks go to the sink while encoding is still running, nothing is
+    written to disk, and None is returned.
+
+    ``compile_slots`` is how many renders may compile at once in this process
+    (the compile_video stage limit); per_scene encoding splits the CPUs by it.
+    """
     config = CONFIG["pipeline"]["video_compilation"]
     start_time = time.time()
     
+    if config.get("encode_mode", "single") == "per_scene":
+        cmd = await encode_scenes(scenes_data, image_paths, audio_data, output_dir, config, compile_slots)
+    else:
+        cmd = build_single_pass(scenes_data, image_paths, audio_data, output_dir, config)
+    
+    # Output path
+    output_path = output_dir / "final_video.mp4"
+    
+    if output_sink is not None:
+        cmd += ['-movflags', FRAGMENTED_MP4_FLAGS, '-f', 'mp4', 'pipe:1']
+    else:
+        if config.get("faststart", True):
+            # moov atom up front: players start before the download finishes
+            cmd += ['-movflags', '+faststart']
+        cmd.append(str(output_path))
+    
+    # Run FFmpeg
+    ffmpeg_start = time.time()
+    logger.info(f"  [Video] Running FFmpeg{' (streaming output)' if output_sink is not None else ''}...")
+    
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    
+    if output_sink is not None:
+        stderr = await stream_output(process, output_sink)
+    else:
+        stdout, stderr = await process.communicate()
+    
+    if process.returncode != 0:
+        logger.error(f"  [Video] FFmpeg failed: {stderr.decode()}")
+        raise Exception(f"FFmpeg failed: {stderr.decode()}")
+    
+    ffmpeg_time = time.time() - ffmpeg_start
+    total_time = time.time() - start_time
+    
+    logger.info(f"  [Video] ✓ Video compiled in {ffmpeg_time:.1f}s (Total: {total_time:.1f}s)")
+    if output_sink is not None:
+        logger.info(f"  [Video] Output: streamed ({output_sink.size / (1024 * 1024):.2f} MB)")
+        return None
+    
+    # Check output file size
+    file_size_mb = output_path.stat().st_size / (1024 * 1024)
+    logger.info(f"  [Video] Output: {output_path.name} ({file_size_mb:.2f} MB)")
+    
+    return output_path
+
+def build_single_pass(
+    scenes_data: ScenesData,
+    image_paths: List[Path],
+    audio_data: Dict[int, Dict],
+    output_dir: Path,
+    config: Dict
+) -> List[str]:
+    """ffmpeg command, up to the output arguments, that renders every scene in
+    one filter graph and one encode."""
+    start_time = time.time()
+    
     logger.info(f"  [Video] Creating subtitles ({config['subtitle_style']} style, mode: {config.get('subtitle_display_mode', 'kinetic')})")
     
     # Create subtitles
@@ -113,15 +198,8 @@ async def compile_video(
     width, height = int(target_res[0]), int(target_res[1])
     
     for i in range(len(scenes_data.scenes)):
-        scale_filter = f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black"
-        
-        if config["transitions"] and i > 0:
-            fade_duration = config["fade_duration_seconds"]
-            scene_duration = audio_data[scenes_data.scenes[i].scene_id]["duration"]
-            scale_filter += f",fade=t=in:st=0:d={fade_duration}"
-            if i < len(scenes_data.scenes) - 1:
-                scale_filter += f",fade=t=out:st={scene_duration - fade_duration}:d={fade_duration}"
-        
+        scene_duration = audio_data[scenes_data.scenes[i].scene_id]["duration"]
+        scale_filter = f"[{i}:v]" + scene_filter(i, len(scenes_data.scenes), scene_duration, width, height, config)
         scale_filter += f"[v{i}]"
         filter_complex_parts.append(scale_filter)
     
@@ -139,50 +217,170 @@ async def compile_video(
     
     filter_complex = ';'.join(filter_complex_parts)
     
-    # Output path
-    output_path = output_dir / "final_video.mp4"
-    
-    # Build FFmpeg command
-    cmd = [
+    return [
         'ffmpeg', '-y',
         *inputs,
         '-filter_complex', filter_complex,
         '-map', '[final]',
         '-map', '[outa]',
-        '-c:v', 'libx264',
-        '-preset', 'medium',
-        '-crf', '23',
-        '-pix_fmt', 'yuv420p',
-        '-c:a', 'aac',
-        '-b:a', '192k',
-        str(output_path)
+        *ENCODE_ARGS,
+        *keyframe_args(config),
+    ]
+
+async def encode_scenes(
+    scenes_data: ScenesData,
+    image_paths: List[Path],
+    audio_data: Dict[int, Dict],
+    output_dir: Path,
+    config: Dict,
+    compile_slots: Optional[int] = None
+) -> List[str]:
+    """Encode each scene (image, voiceover and its own subtitle slice) on a
+    separate ffmpeg process, up to ``scene_concurrency`` at a time, and return
+    the command, up to the output arguments, that joins them with the concat
+    demuxer and ``-c copy``.
+
+    Every part uses the same encoder settings, so the join needs no re-encode.
+    A render gets ``cpu_count / compile_slots`` CPUs. By default it runs that
+    many scenes at once, and each encoder's threads are capped to its share,
+    so concurrent renders don't oversubscribe the box.
+    """
+    scenes_dir = output_dir / "scenes"
+    scenes_dir.mkdir(exist_ok=True)
+    target_res = config["resolution"].split('x')
+    width, height = int(target_res[0]), int(target_res[1])
+    count = len(scenes_data.scenes)
+    budget = max(1, (os.cpu_count() or 1) // (compile_slots or 1))   # this render's share of the CPUs
+    limit = min(config.get("scene_concurrency") or budget, count)
+    threads = max(1, budget // limit)
+    semaphore = asyncio.Semaphore(limit)
+    
+    logger.info(f"  [Video] Encoding {count} scenes in parallel (up to {limit} at a time, {threads} threads each, {config['resolution']}, transitions: {config['transitions']})")
+    start_time = time.time()
+    
+    async def encode(i: int, scene, img_path: Path) -> Path:
+        duration = audio_data[scene.scene_id]["duration"]
+        # captions for this scene only, timed from its own start
+        subtitle_path = create_kinetic_subtitles(
+            scenes_data.copy(update={"scenes": [scene]}),
+            audio_data,
+            scenes_dir,
+            config["subtitle_style"],
+            config.get("subtitle_display_mode", "kinetic"),
+            config.get("subtitle_timing_offset", 0.0),
+            config.get("subtitle_font_size", None),
+            filename=f"scene_{i:02d}.ass"
+        )
+        part_path = scenes_dir / f"scene_{i:02d}.mp4"
+        cmd = [
+            'ffmpeg', '-y',
+            '-loop', '1', '-t', str(duration), '-i', str(img_path),
+            '-i', audio_data[scene.scene_id]["audio_path"],
+            '-filter_complex', f"[0:v]{scene_filter(i, count, duration, width, height, config)},ass={subtitle_path}[final]",
+            '-map', '[final]',
+            '-map', '1:a',
+            *ENCODE_ARGS,
+            *keyframe_args(config),
+            '-threads', str(threads),
+            '-t', str(duration),
+            str(part_path)
+        ]
+        async with semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            logger.error(f"  [Video] FFmpeg failed on scene {scene.scene_id}: {stderr.decode()}")
+            raise Exception(f"FFmpeg failed on scene {scene.scene_id}: {stderr.decode()}")
+        return part_path
+    
+    part_paths = await asyncio.gather(*(
+        encode(i, scene, img_path)
+        for i, (scene, img_path) in enumerate(zip(scenes_data.scenes, image_paths))
+    ))
+    logger.info(f"  [Video] ✓ Scenes encoded in {time.time() - start_time:.1f}s")
+    
+    concat_list = scenes_dir / "concat.txt"
+    with open(concat_list, 'w') as f:
+        f.writelines(f"file '{path.name}'\n" for path in part_paths)
+    
+    return [
+        'ffmpeg', '-y',
+        '-f', 'concat', '-safe', '0',
+        '-i', str(concat_list),
+        '-c', 'copy',
     ]
+
+def scene_filter(index: int, count: int, duration: float, width: int, height: int, config: Dict) -> str:
+    """Scale and pad one scene's image to the target resolution, with its fades."""
+    video_filter = f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black"
     
-    # Run FFmpeg
-    ffmpeg_start = time.time()
-    logger.info(f"  [Video] Running FFmpeg...")
+    if config["transitions"] and index > 0:
+        fade_duration = config["fade_duration_seconds"]
+        video_filter += f",fade=t=in:st=0:d={fade_duration}"
+        if index < count - 1:
+            video_filter += f",fade=t=out:st={duration - fade_duration}:d={fade_duration}"
     
+    return video_filter
+
+def keyframe_args(config: Dict) -> List[str]:
+    hls = config.get("hls") or {}
+    if hls.get("enabled"):
+        # keyframes on the segment grid, so package_hls can cut without re-encoding
+        return ['-force_key_frames', f"expr:gte(t,n_forced*{hls['segment_seconds']})"]
+    return []
+
+async def stream_output(process: asyncio.subprocess.Process, sink) -> bytes:
+    """Copy ffmpeg's stdout into ``sink`` until it exits; returns its stderr.
+
+    stderr is drained alongside so ffmpeg never blocks on a full pipe. A slow
+    sink slows the reads, and through the pipe ffmpeg itself. If the sink
+    fails, ffmpeg is killed.
+    """
+    stderr_task = asyncio.create_task(process.stderr.read())
+    try:
+        while chunk := await process.stdout.read(STREAM_CHUNK_BYTES):
+            await sink.write(chunk)
+    except BaseException:
+        process.kill()
+        await process.wait()
+        stderr_task.cancel()
+        raise
+    stderr = await stderr_task
+    await process.wait()
+    return stderr
+
+async def package_hls(video_path: Path, hls_dir: Path, segment_seconds: float) -> Path:
+    """Remux ``video_path`` into an HLS VOD playlist with MPEG-TS segments in
+    ``hls_dir``; returns the playlist path. Streams are copied, not re-encoded."""
+    hls_dir.mkdir(parents=True, exist_ok=True)
+    playlist_path = hls_dir / HLS_PLAYLIST
+    cmd = [
+        'ffmpeg', '-y',
+        '-i', str(video_path),
+        '-c', 'copy',
+        '-f', 'hls',
+        '-hls_time', str(segment_seconds),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', str(hls_dir / 'segment_%03d.ts'),
+        str(playlist_path)
+    ]
+    start_time = time.time()
     process = await asyncio.create_subprocess_exec(
         *cmd,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE
     )
-    
     stdout, stderr = await process.communicate()
-    
     if process.returncode != 0:
-        logger.error(f"  [Video] FFmpeg failed: {stderr.decode()}")
-        raise Exception(f"FFmpeg failed: {stderr.decode()}")
-    
-    ffmpeg_time = time.time() - ffmpeg_start
-    total_time = time.time() - start_time
-    
-    # Check output file size
-    file_size_mb = output_path.stat().st_size / (1024 * 1024)
-    logger.info(f"  [Video] ✓ Video compiled in {ffmpeg_time:.1f}s (Total: {total_time:.1f}s)")
-    logger.info(f"  [Video] Output: {output_path.name} ({file_size_mb:.2f} MB)")
-    
-    return output_path
+        logger.error(f"  [Video] HLS packaging failed: {stderr.decode()}")
+        raise Exception(f"HLS packaging failed: {stderr.decode()}")
+    segments = len(list(hls_dir.glob('*.ts')))
+    logger.info(f"  [Video] ✓ HLS packaged in {time.time() - start_time:.1f}s ({segments} segments)")
+    return playlist_path
 
 def create_kinetic_subtitles(
     scenes_data: ScenesData,
@@ -191,7 +389,8 @@ def create_kinetic_subtitles(
     style_name: str,
     display_mode: str = "kinetic",
     timing_offset: float = 0.0,
-    font_size: int = None
+    font_size: int = None,
+    filename: str = "subtitles.ass"
 ) -> Path:
     style = SUBTITLE_STYLES.get(style_name, SUBTITLE_STYLES["modern"]).copy()
     
@@ -269,7 +468,7 @@ def create_kinetic_subtitles(
         current_time += audio_data[scene.scene_id]["duration"]
     
     # Save subtitle file
-    subtitle_path = output_dir / "subtitles.ass"
+    subtitle_path = output_dir / filename
     with open(subtitle_path, 'w', encoding='utf-8') as f:
         f.write(ass_content)
     
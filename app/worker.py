@@ -0,0 +1,55 @@
+"""Standalone render worker.
+
+Run with ``python -m app.worker``. Pulls jobs from the ``video_jobs`` queue and
+runs ``VideoPipeline`` outside the API process, with separate concurrency
+pools for the provider-bound stages and the ffmpeg compile stage.
+"""
+import argparse
+import asyncio
+import os
+import signal
+
+from . import jobs
+from .video_pipeline.orchestrator import STAGES, StageLimits, VideoPipeline
+
+
+def stage_limits_from_config(overrides: dict | None = None) -> StageLimits:
+    limits = dict(jobs.WORKER_CONFIG.get("stage_concurrency") or {})
+    limits.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    if not limits.get("compile_video"):
+        limits["compile_video"] = max(1, (os.cpu_count() or 2) // 2)
+    return StageLimits(limits)
+
+
+async def main(concurrency: int, limits: StageLimits, worker_id: str):
+    pipeline = VideoPipeline(limits)
+    stop = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # finish in-flight renders, stop claiming new ones
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"[worker] {worker_id}: {concurrency} job slots, stage limits {limits.limits}")
+    await asyncio.gather(*(
+        jobs.run_worker(f"{worker_id}/{slot}", pipeline, stop)
+        for slot in range(concurrency)
+    ))
+    print(f"[worker] {worker_id}: drained, exiting")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Campfire video render worker")
+    parser.add_argument("--concurrency", type=int, default=jobs.WORKER_CONFIG["concurrency"],
+                        help="jobs in flight in this process")
+    parser.add_argument("--worker-id", default=jobs.default_worker_id())
+    for stage in STAGES:
+        parser.add_argument(f"--{stage.replace('_', '-')}-concurrency", dest=stage, type=int,
+                            help=f"max concurrent {stage} calls")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    limits = stage_limits_from_config({stage: getattr(args, stage) for stage in STAGES})
+    asyncio.run(main(args.concurrency, limits, args.worker_id))
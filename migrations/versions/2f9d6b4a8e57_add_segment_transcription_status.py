@@ -0,0 +1,32 @@
+"""add segments.transcription_status
+
+Revision ID: 2f9d6b4a8e57
+Revises: 8c4f0a6e3b21
+Create Date: 2026-10-18 11:02:17.094413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2f9d6b4a8e57'
+down_revision: Union[str, None] = '8c4f0a6e3b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+transcriptionstatus = sa.Enum('pending', 'processing', 'completed', 'failed', name='transcriptionstatus')
+
+
+def upgrade() -> None:
+    transcriptionstatus.create(op.get_bind(), checkfirst=True)
+    # existing rows were transcribed synchronously, so they are already done
+    op.add_column('segments', sa.Column('transcription_status', transcriptionstatus,
+                                        nullable=False, server_default='completed'))
+    op.alter_column('segments', 'transcription_status', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('segments', 'transcription_status')
+    transcriptionstatus.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""add dreams.segment_count, total_duration and last_segment_at
+
+Revision ID: 3d6f8b2a4c75
+Revises: 9a3c5e7f1d24
+Create Date: 2026-10-18 15:12:44.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3d6f8b2a4c75'
+down_revision: Union[str, None] = '9a3c5e7f1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('dreams', sa.Column('segment_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('dreams', sa.Column('total_duration', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('dreams', sa.Column('last_segment_at', sa.DateTime(), nullable=True))
+    # segments carry no timestamp, so the last write to the dream stands in for last_segment_at
+    op.execute("""
+        UPDATE dreams d
+        SET segment_count = s.n, total_duration = s.total, last_segment_at = d.updated_at
+        FROM (SELECT dream_id, count(*) AS n, sum(duration) AS total FROM segments GROUP BY dream_id) s
+        WHERE s.dream_id = d.id
+    """)
+    op.alter_column('dreams', 'segment_count', server_default=None)
+    op.alter_column('dreams', 'total_duration', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('dreams', 'last_segment_at')
+    op.drop_column('dreams', 'total_duration')
+    op.drop_column('dreams', 'segment_count')
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""initial schema
+
+Revision ID: 5b1e2c7d9a10
+Revises: 
+Create Date: 2026-10-18 09:12:41.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e2c7d9a10'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # databases made by the app's old startup create_all already have both
+    # tables with this exact schema; adopt them instead of failing
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if {'dreams', 'segments'} <= existing:
+        return
+    op.create_table('dreams',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('transcript', sa.Text(), nullable=True),
+    sa.Column('state', sa.Enum('draft', 'completed', 'video_generated', name='dreamstate'), nullable=False),
+    sa.Column('video_s3_key', sa.String(length=512), nullable=True),
+    sa.Column('video_metadata', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('segments',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('dream_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('filename', sa.String(length=255), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.Column('order', sa.Integer(), nullable=False),
+    sa.Column('s3_key', sa.String(length=512), nullable=False),
+    sa.Column('transcript', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['dream_id'], ['dreams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('segments')
+    op.drop_table('dreams')
+    sa.Enum(name='dreamstate').drop(op.get_bind(), checkfirst=True)
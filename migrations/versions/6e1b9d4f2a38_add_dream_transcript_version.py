@@ -0,0 +1,27 @@
+"""add dreams.transcript_version
+
+Revision ID: 6e1b9d4f2a38
+Revises: 3d6f8b2a4c75
+Create Date: 2026-10-18 15:47:31.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1b9d4f2a38'
+down_revision: Union[str, None] = '3d6f8b2a4c75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # left NULL: existing transcripts were appended in arrival order and are
+    # re-derived in segment order on the next segment change or /finish
+    op.add_column('dreams', sa.Column('transcript_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('dreams', 'transcript_version')
\ No newline at end of file
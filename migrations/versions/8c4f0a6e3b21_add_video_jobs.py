@@ -0,0 +1,47 @@
+"""add video_jobs queue
+
+Revision ID: 8c4f0a6e3b21
+Revises: 5b1e2c7d9a10
+Create Date: 2026-10-18 09:40:03.551872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f0a6e3b21'
+down_revision: Union[str, None] = '5b1e2c7d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('video_jobs',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('dream_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('status', sa.Enum('queued', 'running', 'succeeded', 'failed', name='videojobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=255), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['dream_id'], ['dreams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_video_jobs_status_run_after', 'video_jobs', ['status', 'run_after'], unique=False)
+    op.create_index('uq_video_jobs_active_dream', 'video_jobs', ['dream_id'], unique=True,
+                    postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_video_jobs_active_dream', table_name='video_jobs')
+    op.drop_index('ix_video_jobs_status_run_after', table_name='video_jobs')
+    op.drop_table('video_jobs')
+    sa.Enum(name='videojobstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,30 @@
+"""add indexes for segment lookups, dream listing and videos awaiting render
+
+Revision ID: 9a3c5e7f1d24
+Revises: e4a8d2c61b93
+Create Date: 2026-10-18 14:31:05.902213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3c5e7f1d24'
+down_revision: Union[str, None] = 'e4a8d2c61b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_segments_dream_id_order', 'segments', ['dream_id', 'order'], unique=False)
+    op.create_index('ix_dreams_created_id', 'dreams', ['created', 'id'], unique=False)
+    op.create_index('ix_dreams_awaiting_video', 'dreams', ['created'], unique=False,
+                    postgresql_where=sa.text("state = 'completed' AND video_s3_key IS NULL"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dreams_awaiting_video', table_name='dreams')
+    op.drop_index('ix_dreams_created_id', table_name='dreams')
+    op.drop_index('ix_segments_dream_id_order', table_name='segments')
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""add a partial index on unfinished segment transcriptions for recovery
+
+Revision ID: a6e3f1c8b205
+Revises: f2a7c9d41e86
+Create Date: 2026-10-18 21:40:17.305218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e3f1c8b205'
+down_revision: Union[str, None] = 'f2a7c9d41e86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_segments_transcription_open', 'segments', ['transcription_status'], unique=False,
+                    postgresql_where=sa.text("transcription_status IN ('pending', 'processing')"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_segments_transcription_open', table_name='segments')
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""add dreams.search_vector, pg_trgm and search indexes
+
+Revision ID: b5d2e8a1c946
+Revises: 6e1b9d4f2a38
+Create Date: 2026-10-18 16:20:09.473260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2e8a1c946'
+down_revision: Union[str, None] = '6e1b9d4f2a38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('dreams', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(transcript, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_dreams_search_vector', 'dreams', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_dreams_title_trgm', 'dreams', ['title'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dreams_title_trgm', table_name='dreams')
+    op.drop_index('ix_dreams_search_vector', table_name='dreams')
+    op.drop_column('dreams', 'search_vector')
+    # pg_trgm is left installed; other schemas may use it
\ No newline at end of file
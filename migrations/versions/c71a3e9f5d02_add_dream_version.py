@@ -0,0 +1,30 @@
+"""add dreams.version and dreams.updated_at
+
+Revision ID: c71a3e9f5d02
+Revises: 2f9d6b4a8e57
+Create Date: 2026-10-18 13:26:50.611728
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71a3e9f5d02'
+down_revision: Union[str, None] = '2f9d6b4a8e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('dreams', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('dreams', sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                      server_default=sa.text("timezone('UTC', now())")))
+    op.alter_column('dreams', 'version', server_default=None)
+    op.alter_column('dreams', 'updated_at', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('dreams', 'updated_at')
+    op.drop_column('dreams', 'version')
@@ -0,0 +1,25 @@
+"""add dreams (updated_at, id) index for the NDJSON export
+
+Revision ID: d8c4a6f0e213
+Revises: b5d2e8a1c946
+Create Date: 2026-10-18 16:58:40.336107
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8c4a6f0e213'
+down_revision: Union[str, None] = 'b5d2e8a1c946'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_dreams_updated_at_id', 'dreams', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dreams_updated_at_id', table_name='dreams')
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""add dream_state_history
+
+Revision ID: e4a8d2c61b93
+Revises: c71a3e9f5d02
+Create Date: 2026-10-18 14:02:17.284611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a8d2c61b93'
+down_revision: Union[str, None] = 'c71a3e9f5d02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the type already exists (dreams.state); don't re-create it
+dreamstate = postgresql.ENUM('draft', 'completed', 'video_generated', name='dreamstate', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dream_state_history',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('dream_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('from_state', dreamstate, nullable=False),
+        sa.Column('to_state', dreamstate, nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['dream_id'], ['dreams.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_dream_state_history_dream_id'), 'dream_state_history', ['dream_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_dream_state_history_dream_id'), table_name='dream_state_history')
+    op.drop_table('dream_state_history')
\ No newline at end of file
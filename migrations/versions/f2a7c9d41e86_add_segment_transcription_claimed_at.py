@@ -0,0 +1,25 @@
+"""add segments.transcription_claimed_at so orphaned transcriptions can be re-queued
+
+Revision ID: f2a7c9d41e86
+Revises: d8c4a6f0e213
+Create Date: 2026-10-18 19:12:05.481930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c9d41e86'
+down_revision: Union[str, None] = 'd8c4a6f0e213'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('segments', sa.Column('transcription_claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('segments', 'transcription_claimed_at')
\ No newline at end of file
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark compile_video's encode modes on synthetic scenes.
+
+"single" renders every scene in one ffmpeg filter graph. "per_scene" encodes
+the scenes in parallel and joins them with the concat demuxer (-c copy).
+Inputs are generated with ffmpeg (test-pattern images, sine-wave narration,
+one caption word every 0.4 s), so no OpenAI calls are made.
+
+Needs ffmpeg on PATH:
+    python test_files/benchmark_encode_modes.py --scenes 6 --seconds 8 --runs 3
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.video_pipeline.config import CONFIG
+from app.video_pipeline.models import Scene, ScenesData
+from app.video_pipeline.video_compiler import compile_video
+
+MODES = ("single", "per_scene")
+
+
+def make_inputs(workdir: Path, scenes: int, seconds: float):
+    scenes_data = ScenesData(
+        dream_summary="benchmark",
+        scenes=[
+            Scene(scene_id=i + 1, summary=f"Scene {i + 1}", visual_prompt="", voiceover_script="", duration_sec=int(seconds))
+            for i in range(scenes)
+        ],
+        total_duration_sec=int(scenes * seconds),
+    )
+    image_paths, audio_data = [], {}
+    for scene in scenes_data.scenes:
+        image_path = workdir / f"scene_{scene.scene_id:02d}.png"
+        audio_path = workdir / f"scene_{scene.scene_id:02d}_voiceover.mp3"
+        subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=1024x1024",
+             "-frames:v", "1", str(image_path)],
+            check=True,
+        )
+        subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency={200 + 50 * scene.scene_id}",
+             "-t", str(seconds), str(audio_path)],
+            check=True,
+        )
+        words = [
+            {"word": f"word{n}", "start": n * 0.4, "end": n * 0.4 + 0.3}
+            for n in range(int(seconds / 0.4))
+        ]
+        image_paths.append(image_path)
+        audio_data[scene.scene_id] = {
+            "audio_path": str(audio_path),
+            "transcript": " ".join(w["word"] for w in words),
+            "words": words,
+            "duration": seconds,
+        }
+    return scenes_data, image_paths, audio_data
+
+
+async def time_mode(mode: str, inputs, workdir: Path, runs: int) -> list[float]:
+    CONFIG["pipeline"]["video_compilation"]["encode_mode"] = mode
+    timings = []
+    for run in range(runs):
+        output_dir = workdir / f"{mode}_{run}"
+        output_dir.mkdir()
+        start = time.perf_counter()
+        await compile_video(*inputs, output_dir=output_dir)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of each scene")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    if not shutil.which("ffmpeg"):
+        sys.exit("ffmpeg not found on PATH")
+
+    workdir = Path(tempfile.mkdtemp(prefix="campfire-bench-"))
+    try:
+        inputs = make_inputs(workdir, args.scenes, args.seconds)
+        print(f"{args.scenes} scenes x {args.seconds:g}s, {os.cpu_count()} CPUs, {args.runs} runs per mode")
+        results = {mode: await time_mode(mode, inputs, workdir, args.runs) for mode in MODES}
+        for mode, timings in results.items():
+            print(f"  {mode:<10} median {statistics.median(timings):6.2f}s  min {min(timings):6.2f}s")
+        speedup = statistics.median(results["single"]) / statistics.median(results["per_scene"])
+        print(f"  per_scene is {speedup:.2f}x the speed of single")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
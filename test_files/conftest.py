@@ -0,0 +1,32 @@
+"""Shared fixtures for the tests in test_files.
+
+Tests that need a migrated Postgres at DATABASE_URL take the ``run`` fixture
+(``asyncio.run``); they are skipped when the database isn't reachable.
+"""
+import asyncio
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Skip the requesting tests unless Postgres answers at DATABASE_URL."""
+    # imported here: app.database needs DATABASE_URL, which the S3-only tests don't
+    from app.database import engine
+
+    async def available() -> bool:
+        try:
+            async with engine.connect():
+                return True
+        except Exception:
+            return False
+        finally:
+            await engine.dispose()
+
+    if not asyncio.run(available()):
+        pytest.skip("Postgres not reachable at DATABASE_URL")
+
+
+@pytest.fixture
+def run(database):
+    return asyncio.run
\ No newline at end of file
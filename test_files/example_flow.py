@@ -4,7 +4,7 @@
 2. Requests a pre-signed upload URL
 3. Uploads a local test audio file to S3 via that URL
 4. Registers the segment with the backend (POST /dreams/{id}/segments/)
-5. Prints the returned transcript
+5. Polls until the background transcription finishes and prints it
 
 Run:  python test_files/example_flow.py
 Assumes API running locally at http://localhost:8000 and AWS creds / env already configured.
@@ -62,9 +62,9 @@ with AUDIO_PATH.open("rb") as f:
 timings["upload_s3"] = time.perf_counter() - start
 print("Upload successful.")
 
-# 4) Register segment with backend, synchronous transcript
+# 4) Register segment with backend, transcription runs in the background
 start = time.perf_counter()
-print("Registering segment … (this may take a few seconds)")
+print("Registering segment …")
 segment_payload = {
     "filename": filename,
     "duration": 10.0,
@@ -79,6 +79,16 @@ segment = resp.json()
 timings["register_segment"] = time.perf_counter() - start
 print(json.dumps(segment, indent=2))
 
+# 5) Poll until the transcript is ready
+start = time.perf_counter()
+print("Waiting for transcript …")
+while segment["transcription_status"] in ("pending", "processing"):
+    time.sleep(0.5)
+    resp = requests.get(f"{API_BASE}/dreams/{dream_id}/segments/")
+    resp.raise_for_status()
+    segment = next(s for s in resp.json() if s["id"] == segment["id"])
+timings["transcribe"] = time.perf_counter() - start
+
 print("\nTranscript:\n", segment.get("transcript"))
 
 print("\n=== Timings (seconds) ===")
@@ -35,7 +35,14 @@ def upload_and_transcribe(dream_id: str, file_path: pathlib.Path, order: int = 0
     }
     r = requests.post(f"{API_BASE}/dreams/{dream_id}/segments/", json=payload)
     r.raise_for_status()
-    return r.json()["transcript"]
+    seg = r.json()
+    # transcription is asynchronous – poll until it settles
+    while seg["transcription_status"] in ("pending", "processing"):
+        time.sleep(0.5)
+        r = requests.get(f"{API_BASE}/dreams/{dream_id}/segments/")
+        r.raise_for_status()
+        seg = next(s for s in r.json() if s["id"] == seg["id"])
+    return seg["transcript"] or ""
 
 def finish_dream(dream_id: str) -> str:
     r = requests.post(f"{API_BASE}/dreams/{dream_id}/finish")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""The event broker re-establishes its LISTEN after the backend is
+terminated, and subscribers hear events published afterwards.
+
+Needs Postgres at DATABASE_URL:
+    python -m pytest test_files/test_event_reconnect.py
+Skips when the database isn't reachable.
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import events
+from app.database import async_session, engine, listen_engine
+
+
+async def _publish(dream_id: str, event: str):
+    async with async_session() as db:
+        await events.publish(db, dream_id, event)
+        await db.commit()
+
+
+async def _reconnect():
+    broker = events.EventBroker(check_interval=0.5, reconnect_delay=0.1)
+    dream_id = str(uuid.uuid4())
+    await broker.start()
+    queue = broker.subscribe(dream_id)
+    try:
+        await _publish(dream_id, "before")
+        before = (await asyncio.wait_for(queue.get(), 5))["event"]
+
+        pid = await broker._driver.fetchval("SELECT pg_backend_pid()")
+        async with async_session() as db:
+            await db.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+        for _ in range(50):
+            if broker.reconnects:
+                break
+            await asyncio.sleep(0.1)
+
+        await _publish(dream_id, "after")
+        after = (await asyncio.wait_for(queue.get(), 5))["event"]
+        return before, broker.reconnects, after
+    finally:
+        broker.unsubscribe(dream_id, queue)
+        await broker.stop()
+        await engine.dispose()
+        await listen_engine.dispose()
+
+
+def test_broker_relistens_after_backend_terminated(run):
+    assert run(_reconnect()) == ("before", 1, "after")
+
+
+if __name__ == "__main__":
+    print(asyncio.run(_reconnect()))
\ No newline at end of file
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Check with EXPLAIN that the hot queries use their indexes.
+
+Loads a few thousand throwaway dreams (8 segments each) into a migrated
+Postgres at DATABASE_URL, ANALYZEs, and inspects the plans:
+    python -m pytest test_files/test_indexes.py
+Skips when the database isn't reachable.
+"""
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+TITLE = "explain-fixture"
+DREAMS = 5000
+SEGMENTS_PER_DREAM = 8
+
+POPULATE = [
+    f"""
+    INSERT INTO dreams (id, created, title, state, video_s3_key, version, updated_at, segment_count, total_duration)
+    SELECT gen_random_uuid(),
+           timezone('UTC', now()) - make_interval(secs => n),
+           '{TITLE}',
+           CASE WHEN n % 100 = 0 THEN 'completed' ELSE 'video_generated' END::dreamstate,
+           CASE WHEN n % 100 = 0 THEN NULL ELSE 'dreams/' || n || '/video.mp4' END,
+           1,
+           timezone('UTC', now()) - make_interval(secs => n),
+           {SEGMENTS_PER_DREAM},
+           {SEGMENTS_PER_DREAM} * 4.2
+    FROM generate_series(1, {DREAMS}) AS n
+    """,
+    f"""
+    INSERT INTO segments (id, dream_id, filename, duration, "order", s3_key, transcription_status)
+    SELECT gen_random_uuid(), d.id, 'clip.m4a', 4.2, o, 'k', 'completed'
+    FROM dreams d, generate_series(0, {SEGMENTS_PER_DREAM - 1}) AS o
+    WHERE d.title = '{TITLE}'
+    """,
+    "SELECT gin_clean_pending_list('ix_dreams_search_vector')",   # fresh rows sit in the GIN pending list
+    "ANALYZE dreams",
+    "ANALYZE segments",
+]
+
+QUERIES = {
+    # get_dream's selectinload and list_segments
+    "ix_segments_dream_id_order": """
+        SELECT * FROM segments
+        WHERE dream_id IN (SELECT id FROM dreams WHERE title = '{title}' LIMIT 1)
+        ORDER BY "order"
+    """,
+    # list_dreams, first page and a later keyset page
+    "ix_dreams_created_id": """
+        SELECT id, created, title, state FROM dreams
+        WHERE (created, id) < (timezone('UTC', now()) - interval '1 hour', gen_random_uuid())
+        ORDER BY created DESC, id DESC LIMIT 51
+    """,
+    # GET /dreams/export.ndjson?since=
+    "ix_dreams_updated_at_id": """
+        SELECT id, title FROM dreams
+        WHERE updated_at >= timezone('UTC', now()) - interval '1 minute'
+        ORDER BY updated_at, id
+    """,
+    # GET /dreams/search, full-text half
+    "ix_dreams_search_vector": """
+        SELECT id FROM dreams
+        WHERE search_vector @@ websearch_to_tsquery('english', 'lighthouse')
+    """,
+    # TranscriptionRunner.recover; every fixture segment is completed
+    "ix_segments_transcription_open": """
+        SELECT dream_id, id, filename FROM segments
+        WHERE transcription_status = 'pending'
+        ORDER BY transcription_claimed_at, id LIMIT 1000
+    """,
+    "ix_dreams_awaiting_video": """
+        SELECT id FROM dreams
+        WHERE state = 'completed' AND video_s3_key IS NULL
+        ORDER BY created LIMIT 50
+    """,
+}
+
+
+async def _plans() -> dict[str, str]:
+    plans = {}
+    try:
+        async with engine.begin() as conn:
+            for stmt in POPULATE:
+                await conn.execute(text(stmt))
+        async with engine.connect() as conn:
+            for index, query in QUERIES.items():
+                result = await conn.execute(text("EXPLAIN " + query.format(title=TITLE)))
+                plans[index] = "\n".join(row[0] for row in result)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DELETE FROM dreams WHERE title = '{TITLE}'"))   # segments cascade
+        await engine.dispose()
+    return plans
+
+
+def test_hot_queries_use_indexes(run):
+    plans = run(_plans())
+    for index, plan in plans.items():
+        assert index in plan, f"{index} not used:\n{plan}"
+
+
+if __name__ == "__main__":
+    for index, plan in asyncio.run(_plans()).items():
+        print(f"-- {index}\n{plan}\n")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""A video job worker keeps heartbeating through a failed heartbeat, and
+stops its render without touching the job once another worker owns it.
+
+Needs a migrated Postgres (alembic upgrade head) at DATABASE_URL:
+    python -m pytest test_files/test_job_lease.py
+Skips when the database isn't reachable.
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, select, update
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, jobs, models, schemas, video
+from app.database import async_session, engine
+
+
+async def _lease_lost(monkeypatch):
+    dream_in = schemas.DreamCreate(id=uuid.uuid4(), title="Lease")
+    heartbeats, rendering = [], asyncio.Event()
+    real_heartbeat = jobs.heartbeat_video_job
+
+    async def flaky_heartbeat(db, job_id, worker_id, lease_seconds):
+        heartbeats.append(worker_id)
+        if len(heartbeats) == 1:
+            raise ConnectionError("database went away")
+        return await real_heartbeat(db, job_id, worker_id, lease_seconds)
+
+    async def endless_render(dream_id, pipeline=None, owned=None):
+        rendering.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setitem(jobs.WORKER_CONFIG, "heartbeat_seconds", 0.05)
+    monkeypatch.setattr(jobs, "heartbeat_video_job", flaky_heartbeat)
+    monkeypatch.setattr(video, "create_video", endless_render)
+    try:
+        async with async_session() as db:
+            dream_id = str((await crud.create_dream(db, dream_in)).id)
+            job = await jobs.enqueue_video_job(db, dream_id)
+            await db.execute(
+                update(models.VideoJob)
+                .where(models.VideoJob.id == job.id)
+                .values(status=models.VideoJobStatus.running, locked_by="worker-a", attempts=1)
+            )
+            await db.commit()
+            job = await db.get(models.VideoJob, job.id)
+
+        runner = asyncio.create_task(jobs.run_video_job(job, "worker-a"))
+        await rendering.wait()
+        await asyncio.sleep(0.2)        # survives the failed first heartbeat
+        still_running = not runner.done()
+
+        async with async_session() as db:
+            await db.execute(
+                update(models.VideoJob).where(models.VideoJob.id == job.id).values(locked_by="worker-b")
+            )
+            await db.commit()
+            owned_by_a = await jobs.owns_video_job(db, job.id, "worker-a")
+            await db.rollback()
+        await asyncio.wait_for(runner, 5)
+
+        async with async_session() as db:
+            locked_by, status = (await db.execute(
+                select(models.VideoJob.locked_by, models.VideoJob.status).where(models.VideoJob.id == job.id)
+            )).one()
+        return still_running, len(heartbeats) > 2, owned_by_a, locked_by, status
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(models.Dream).where(models.Dream.id == dream_in.id))
+            await db.commit()
+        await engine.dispose()
+
+
+def test_lost_lease_cancels_render(run, monkeypatch):
+    still_running, retried, owned_by_a, locked_by, status = run(_lease_lost(monkeypatch))
+    assert still_running and retried
+    assert not owned_by_a
+    assert (locked_by, status) == ("worker-b", models.VideoJobStatus.running)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Check the streamed video upload: a subprocess's stdout piped through
+video_compiler.stream_output into storage.MultipartUpload.
+
+Run: python -m pytest test_files/test_multipart_stream.py
+No AWS access or ffmpeg needed; S3 is a botocore Stubber and the encoder is a
+Python one-liner writing to stdout.
+"""
+import asyncio
+import os
+import sys
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import ANY, Stubber
+
+os.environ.setdefault("S3_BUCKET", "campfire-test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage import MIN_PART_SIZE, MultipartUpload, Storage
+from app.video_pipeline.video_compiler import stream_output
+
+KEY = "dreams/test/video.mp4"
+SIZE = 2 * MIN_PART_SIZE + 123     # two full parts and a short last one
+
+
+def stubbed_storage():
+    client = boto3.client(
+        "s3", region_name="us-west-2",
+        aws_access_key_id="AKIDEXAMPLE", aws_secret_access_key="secret",
+    )
+    return Storage(client, "campfire-test", max_workers=2), Stubber(client)
+
+
+async def encode_into(sink, fail: bool = False):
+    # stands in for ffmpeg writing fragmented MP4 to pipe:1
+    script = f"import sys; sys.stdout.buffer.write(b'x' * {SIZE}); sys.exit({int(fail)})"
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", script,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    await stream_output(process, sink)
+    if process.returncode != 0:
+        raise RuntimeError("encoder failed")
+
+
+def test_streams_parts_and_completes():
+    storage, stubber = stubbed_storage()
+    stubber.add_response(
+        "create_multipart_upload", {"UploadId": "u1"},
+        {"Bucket": "campfire-test", "Key": KEY, "ContentType": "video/mp4"},
+    )
+    for number in (1, 2, 3):
+        stubber.add_response(
+            "upload_part", {"ETag": f'"etag-{number}"'},
+            {"Bucket": "campfire-test", "Key": KEY, "UploadId": "u1", "PartNumber": number, "Body": ANY},
+        )
+    stubber.add_response("complete_multipart_upload", {}, {
+        "Bucket": "campfire-test", "Key": KEY, "UploadId": "u1",
+        "MultipartUpload": {"Parts": [
+            {"PartNumber": number, "ETag": f'"etag-{number}"'} for number in (1, 2, 3)
+        ]},
+    })
+
+    async def scenario():
+        # one part in flight keeps the stubbed calls in a fixed order
+        async with MultipartUpload(storage, KEY, "video/mp4", concurrency=1) as sink:
+            await encode_into(sink)
+        return sink.size
+
+    with stubber:
+        assert asyncio.run(scenario()) == SIZE
+        stubber.assert_no_pending_responses()
+    storage.shutdown()
+
+
+def test_failed_encode_aborts_upload():
+    storage, stubber = stubbed_storage()
+    stubber.add_response("create_multipart_upload", {"UploadId": "u2"})
+    for number in (1, 2):
+        stubber.add_response("upload_part", {"ETag": f'"etag-{number}"'})
+    stubber.add_response(
+        "abort_multipart_upload", {},
+        {"Bucket": "campfire-test", "Key": KEY, "UploadId": "u2"},
+    )
+
+    async def scenario():
+        async with MultipartUpload(storage, KEY, concurrency=1) as sink:
+            await encode_into(sink, fail=True)
+
+    with stubber:
+        with pytest.raises(RuntimeError, match="encoder failed"):
+            asyncio.run(scenario())
+        stubber.assert_no_pending_responses()
+    storage.shutdown()
+
+
+def test_failed_last_part_aborts_upload():
+    storage, stubber = stubbed_storage()
+    stubber.add_response("create_multipart_upload", {"UploadId": "u3"})
+    for number in (1, 2):
+        stubber.add_response("upload_part", {"ETag": f'"etag-{number}"'})
+    stubber.add_client_error("upload_part", "InternalError", http_status_code=500)   # the short last part
+    stubber.add_response(
+        "abort_multipart_upload", {},
+        {"Bucket": "campfire-test", "Key": KEY, "UploadId": "u3"},
+    )
+
+    async def scenario():
+        async with MultipartUpload(storage, KEY, concurrency=1) as sink:
+            await encode_into(sink)
+
+    with stubber:
+        with pytest.raises(ClientError):
+            asyncio.run(scenario())
+        stubber.assert_no_pending_responses()
+    storage.shutdown()
+
+
+if __name__ == "__main__":
+    test_streams_parts_and_completes()
+    test_failed_encode_aborts_upload()
+    test_failed_last_part_aborts_upload()
+    print("✅ Streamed multipart upload works")
\ No newline at end of file
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Check that app.presign produces the same URLs as botocore.
+
+Run: python -m pytest test_files/test_presign.py
+No AWS access needed; both sides sign with fixed dummy credentials and a
+frozen clock.
+"""
+import os
+import sys
+from datetime import datetime
+from unittest import mock
+
+import boto3
+from botocore.config import Config
+from botocore.credentials import Credentials
+
+os.environ.setdefault("S3_BUCKET", "campfire-test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.presign import Presigner, PresignedUrlCache, sign_playlist
+
+NOW = datetime(2026, 3, 14, 15, 9, 26)
+KEYS = [
+    "dreams/3f2b8c1e-0d4a-4f57-9a57-1b7e4c8f2d10/video.mp4",
+    "dreams/abc/clip 01 (take 2).m4a",
+    "dreams/abc/ünïcødé+plus&amp=eq?.m4a",
+    "dreams/abc/~tilde*star'quote.m4a",
+]
+
+
+def botocore_url(method, bucket, region, key, expires, token=None):
+    client = boto3.client(
+        "s3",
+        region_name=region,
+        aws_access_key_id="AKIDEXAMPLE",
+        aws_secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        aws_session_token=token,
+        config=Config(signature_version="s3v4"),
+    )
+    operation = {"GET": "get_object", "PUT": "put_object"}[method]
+    with mock.patch("botocore.auth.datetime") as fake:
+        fake.datetime.utcnow.return_value = NOW
+        return client.generate_presigned_url(
+            operation, Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires
+        )
+
+
+def local_url(method, bucket, region, key, expires, token=None):
+    creds = Credentials("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY", token)
+    return Presigner(bucket, region, creds).presign(method, key, expires, now=NOW)
+
+
+def test_matches_botocore():
+    for bucket in ("campfire-test", "campfire.dotted.bucket"):
+        for region in ("us-west-2", "us-east-1", "eu-central-1"):
+            for method, expires in (("GET", 3600), ("PUT", 600)):
+                for key in KEYS:
+                    expected = botocore_url(method, bucket, region, key, expires)
+                    assert local_url(method, bucket, region, key, expires) == expected, (bucket, region, key)
+
+
+def test_matches_botocore_with_session_token():
+    token = "FQoGZXIvYXdzEJr//////////wEaDOLt+session/token=="
+    expected = botocore_url("GET", "campfire-test", "us-west-2", KEYS[0], 3600, token)
+    assert local_url("GET", "campfire-test", "us-west-2", KEYS[0], 3600, token) == expected
+
+
+def test_sign_playlist():
+    creds = Credentials("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+    urls = PresignedUrlCache(Presigner("campfire-test", "us-west-2", creds), expires=3600, min_remaining=300)
+    playlist = "\n".join([
+        "#EXTM3U", "#EXT-X-TARGETDURATION:2", "#EXTINF:2.000000,", "segment_000.ts",
+        "#EXTINF:1.500000,", "segment_001.ts", "#EXT-X-ENDLIST",
+    ])
+    signed, expires_in = sign_playlist(playlist, "dreams/abc/hls/", urls)
+    lines = signed.splitlines()
+    assert lines[3] == urls.get("dreams/abc/hls/segment_000.ts")[0]
+    assert lines[5] == urls.get("dreams/abc/hls/segment_001.ts")[0]
+    assert [l for i, l in enumerate(lines) if i not in (3, 5)] == [
+        l for i, l in enumerate(playlist.splitlines()) if i not in (3, 5)
+    ]
+    assert 3500 < expires_in <= 3600
+
+
+if __name__ == "__main__":
+    test_matches_botocore()
+    test_matches_botocore_with_session_token()
+    test_sign_playlist()
+    print("✅ Presigned URLs match botocore")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Count the SQL statements issued by the create/add/remove-segment, rename and
+state transition write paths, and by the light get_dream views.
+
+Needs a migrated Postgres (alembic upgrade head) at DATABASE_URL:
+    python -m pytest test_files/test_query_counts.py
+Skips when the database isn't reachable.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, event, select
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, models, schemas
+from app.database import async_session, engine
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+def segment(order: int = 0) -> schemas.AudioSegmentCreate:
+    return schemas.AudioSegmentCreate(
+        segment_id=uuid.uuid4(), filename=f"clip_{order}.m4a", duration=4.2, order=order, s3_key=f"k/{order}"
+    )
+
+
+async def _create_and_add():
+    dream_in = schemas.DreamCreate(id=uuid.uuid4(), title="Query count")
+    seg = segment()
+    counts = {}
+    try:
+        async with async_session() as db:
+            with count_statements() as stmts:
+                dream = await crud.create_dream(db, dream_in)
+            counts["create"] = len(stmts)
+            assert dream.segments == []
+
+            with count_statements() as stmts:
+                again = await crud.create_dream(db, dream_in)
+            counts["create_replay"] = len(stmts)
+            assert again.id == dream.id
+
+            with count_statements() as stmts:
+                stored = await crud.add_segment(db, str(dream.id), seg)
+            counts["add_segment"] = len(stmts)
+            assert stored.transcription_status == models.TranscriptionStatus.pending
+
+            with count_statements() as stmts:
+                replay = await crud.add_segment(db, str(dream.id), seg)
+            counts["add_segment_replay"] = len(stmts)
+            assert replay.id == stored.id
+
+            assert await crud.get_dream_version(db, str(dream.id)) == 2   # bumped once, by the real insert
+
+            with count_statements() as stmts:
+                renamed = await crud.update_title(db, str(dream.id), "Renamed")
+            counts["update_title"] = len(stmts)
+            assert [s.id for s in renamed.segments] == [stored.id]
+
+            with count_statements() as stmts:
+                light = await crud.get_dream(db, str(dream.id), "transcript")
+            counts["get_dream_transcript"] = len(stmts)
+            assert light.version == 3
+
+            with count_statements() as stmts:
+                await crud.remove_segment(db, str(dream.id), str(stored.id))
+            counts["remove_segment"] = len(stmts)
+            counters = await crud.get_dream(db, str(dream.id), crud.dream_loader(("segment_count", "total_duration"), segments=False))
+            assert (counters.segment_count, counters.total_duration) == (0, 0.0)
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(models.Dream).where(models.Dream.id == dream_in.id))
+            await db.commit()
+        await engine.dispose()
+    return counts
+
+
+def test_write_path_query_counts(run):
+    counts = run(_create_and_add())
+    assert counts == {
+        "create": 1,              # INSERT ... ON CONFLICT DO NOTHING RETURNING
+        "create_replay": 3,       # the no-op INSERT, then the dream and its segments
+        "add_segment": 1,         # INSERT + version bump in one CTE statement
+        "add_segment_replay": 2,  # the no-op INSERT, then the stored segment
+        "update_title": 2,        # UPDATE ... RETURNING the row, then its segments
+        "get_dream_transcript": 1,  # three columns, no segments query
+        "remove_segment": 2,      # lock the dream, then DELETE + counters update (transcript marked stale) in one statement
+    }, counts
+
+
+async def _transitions():
+    dream_in = schemas.DreamCreate(id=uuid.uuid4(), title="Transitions")
+    counts = {}
+    try:
+        async with async_session() as db:
+            dream_id = str((await crud.create_dream(db, dream_in)).id)
+            # commit=False leaves it to the caller: a rollback (say, the job insert failed) undoes it all
+            assert await crud.transition_state(db, dream_id, models.DreamState.draft, models.DreamState.completed, commit=False)
+            await db.rollback()
+            assert await crud.get_dream_state(db, dream_id) == models.DreamState.draft
+
+            with count_statements() as stmts:
+                assert await crud.transition_state(db, dream_id, models.DreamState.draft, models.DreamState.completed)
+            counts["transition"] = len(stmts)
+
+            with count_statements() as stmts:   # lost the race: someone already moved it
+                assert not await crud.transition_state(db, dream_id, models.DreamState.draft, models.DreamState.completed)
+            counts["stale_transition"] = len(stmts)
+
+            history = (await db.execute(
+                select(models.DreamStateHistory.from_state, models.DreamStateHistory.to_state)
+                .where(models.DreamStateHistory.dream_id == dream_in.id)
+            )).all()
+            assert history == [(models.DreamState.draft, models.DreamState.completed)]
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(models.Dream).where(models.Dream.id == dream_in.id))
+            await db.commit()
+        await engine.dispose()
+    return counts
+
+
+def test_transition_query_counts(run):
+    counts = run(_transitions())
+    assert counts == {
+        "transition": 2,        # conditional UPDATE + history INSERT in one statement, then the NOTIFY
+        "stale_transition": 1,  # the UPDATE matches nothing
+    }, counts
+
+
+if __name__ == "__main__":
+    print(asyncio.run(_create_and_add()))
+    print(asyncio.run(_transitions()))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""The dream transcript follows segment order, whatever order transcriptions
+finish in, and drops the text of removed segments. Segment writes only mark
+it stale; readers see the joined text, and refresh_transcript stores it.
+
+Needs a migrated Postgres (alembic upgrade head) at DATABASE_URL:
+    python -m pytest test_files/test_transcript_order.py
+Skips when the database isn't reachable.
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import delete
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, models, schemas
+from app.database import async_session, engine
+
+
+async def _store(dream_id: str, segment_id: uuid.UUID, text: str):
+    async with async_session() as db:
+        assert await crud.store_segment_transcript(db, dream_id, str(segment_id), text)
+        await db.commit()
+
+
+async def _current(db, dream_id: str):
+    """(what a reader sees while stale, what refresh stores, whether it's current after)"""
+    dream = await crud.get_dream(db, dream_id, "transcript")
+    stale = dream.transcript_version is None
+    await crud.fill_stale_transcript(db, dream)
+    read = dream.transcript
+    stored = await crud.refresh_transcript(db, dream_id)
+    dream = await crud.get_dream(db, dream_id, "finish")
+    current = stale and dream.transcript_version == await crud.get_dream_version(db, dream_id)
+    return read, stored, current
+
+
+async def _transcripts():
+    dream_in = schemas.DreamCreate(id=uuid.uuid4(), title="Transcript order")
+    seen = []
+    try:
+        async with async_session() as db:
+            dream_id = str((await crud.create_dream(db, dream_in)).id)
+            segs = [
+                schemas.AudioSegmentCreate(segment_id=uuid.uuid4(), filename=f"c{i}.m4a", duration=1.0, order=i, s3_key=f"k/{i}")
+                for i in range(4)
+            ]
+            await crud.add_segments(db, dream_id, segs)
+        ids = [seg.segment_id for seg in segs]
+
+        # finish out of order, two of them concurrently
+        await _store(dream_id, ids[2], " two ")
+        await asyncio.gather(_store(dream_id, ids[0], "zero"), _store(dream_id, ids[3], "three"))
+        await _store(dream_id, ids[1], "one")
+
+        async with async_session() as db:
+            seen.append(await _current(db, dream_id))
+            await crud.remove_segment(db, dream_id, str(ids[1]))
+            seen.append(await _current(db, dream_id))
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(models.Dream).where(models.Dream.id == dream_in.id))
+            await db.commit()
+        await engine.dispose()
+    return seen
+
+
+def test_transcript_follows_segment_order(run):
+    assert run(_transcripts()) == [
+        ("zero one two three", "zero one two three", True),
+        ("zero two three", "zero two three", True),
+    ]
+
+
+if __name__ == "__main__":
+    print(asyncio.run(_transcripts()))
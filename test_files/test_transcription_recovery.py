@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""TranscriptionRunner.recover re-queues pending segments and resets
+segments stuck in processing past the claim timeout, but leaves a fresh
+claim alone.
+
+Needs a migrated Postgres (alembic upgrade head) at DATABASE_URL:
+    python -m pytest test_files/test_transcription_recovery.py
+Skips when the database isn't reachable.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, select, update
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, models, schemas
+from app.database import async_session, engine
+from app.transcribe import TranscriptionRunner
+
+Status = models.TranscriptionStatus
+
+
+async def _recover():
+    dream_in = schemas.DreamCreate(id=uuid.uuid4(), title="Recovery")
+    segs = [
+        schemas.AudioSegmentCreate(segment_id=uuid.uuid4(), filename=f"c{i}.m4a", duration=1.0, order=i, s3_key=f"k/{i}")
+        for i in range(3)
+    ]
+    pending, orphaned, fresh = (seg.segment_id for seg in segs)
+    runner = TranscriptionRunner(concurrency=0, queue_size=10, claim_timeout=600, recover_interval=60)
+    try:
+        async with async_session() as db:
+            dream_id = str((await crud.create_dream(db, dream_in)).id)
+            await crud.add_segments(db, dream_id, segs)
+            for segment_id, claimed_at in ((orphaned, datetime.utcnow() - timedelta(hours=1)), (fresh, datetime.utcnow())):
+                await db.execute(
+                    update(models.AudioSegment)
+                    .where(models.AudioSegment.id == segment_id)
+                    .values(transcription_status=Status.processing, transcription_claimed_at=claimed_at)
+                )
+            await db.commit()
+            version = await crud.get_dream_version(db, dream_id)
+
+        await runner.recover()
+        await runner.recover()          # a second pass doesn't queue the same segments again
+
+        async with async_session() as db:
+            statuses = dict((await db.execute(
+                select(models.AudioSegment.id, models.AudioSegment.transcription_status)
+                .where(models.AudioSegment.dream_id == dream_in.id)
+            )).all())
+            bumped = await crud.get_dream_version(db, dream_id) == version + 1
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(models.Dream).where(models.Dream.id == dream_in.id))
+            await db.commit()
+        await engine.dispose()
+    queued = []
+    while not runner.queue.empty():
+        queued.append(uuid.UUID(runner.queue.get_nowait()[1]))
+    mine = {pending, orphaned, fresh}
+    return (
+        [statuses[pending], statuses[orphaned], statuses[fresh]],
+        sorted(s for s in queued if s in mine) == sorted([pending, orphaned]),
+        bumped,
+    )
+
+
+def test_recover_requeues_pending_and_orphaned(run):
+    statuses, queued_once, bumped = run(_recover())
+    assert statuses == [Status.pending, Status.pending, Status.processing]
+    assert queued_once
+    assert bumped
+
+
+if __name__ == "__main__":
+    import asyncio
+    print(asyncio.run(_recover()))
\ No newline at end of file